@@ -6,23 +6,35 @@ All data comes from database - no hardcoded data!
 
 from fastapi import FastAPI, HTTPException, Query
 from typing import List, Optional, Dict, Any
+from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
+import mongo_pool
+import metrics
 from bson import ObjectId
 import json
+from pagination import decode_cursor, next_cursor
 
 # Load environment
 load_dotenv()
 
-app = FastAPI(title="Sikkim Districts API", description="Fetch data from MongoDB Atlas")
-
 # MongoDB connection
 def get_collection():
-    uri = os.getenv("MONGO_URI")
-    client = MongoClient(uri)
-    db = client["sih2"]
-    return db["sikkim"]
+    return mongo_pool.get_collection("sikkim")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Index backing the (district_name, _id) keyset scan
+    try:
+        get_collection().create_index([("district_name", 1), ("_id", 1)])
+    except Exception as e:
+        # Start anyway; requests degrade until MongoDB is reachable
+        print(f"⚠️ Could not create the district_name index at startup: {e}")
+    async with mongo_pool.lifespan(app):
+        yield
+
+app = FastAPI(title="Sikkim Districts API", description="Fetch data from MongoDB Atlas", lifespan=lifespan)
+app.include_router(metrics.router)
 
 def serialize_doc(doc):
     """Convert MongoDB document to JSON serializable format"""
@@ -46,16 +58,31 @@ def get_districts():
 def get_district_data(
     district_name: str,
     limit: int = Query(100, description="Limit number of records"),
-    skip: int = Query(0, description="Skip number of records")
+    skip: int = Query(0, description="Skip number of records"),
+    after: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor")
 ):
     """Get all data for a specific district"""
     collection = get_collection()
     
     query = {"district_name": district_name}
-    cursor = collection.find(query).skip(skip).limit(limit)
-    documents = [serialize_doc(doc) for doc in cursor]
-    
-    if not documents:
+    page_query = dict(query)
+    if after:
+        try:
+            key = decode_cursor(after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if key.get("district_name") != district_name:
+            raise HTTPException(status_code=400, detail="Cursor belongs to a different district")
+        page_query["_id"] = {"$gt": key["_id"]}
+    
+    cursor = collection.find(page_query).sort([("district_name", 1), ("_id", 1)])
+    if not after:
+        cursor = cursor.skip(skip)
+    raw_documents = list(cursor.limit(limit))
+    cursor_token = next_cursor(raw_documents, limit, district_name=district_name)
+    documents = [serialize_doc(doc) for doc in raw_documents]
+    
+    if not documents and not after:
         raise HTTPException(status_code=404, detail=f"District '{district_name}' not found")
     
     total = collection.count_documents(query)
@@ -66,6 +93,7 @@ def get_district_data(
         "returned_records": len(documents),
         "skip": skip,
         "limit": limit,
+        "next_cursor": cursor_token,
         "data": documents
     }
 
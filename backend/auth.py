@@ -3,25 +3,136 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from database import get_database
+import metrics
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor; hashes with any other cost are transparently rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Max concurrent hash/verify operations (bcrypt releases the GIL, so threads run in parallel)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
 security = HTTPBearer()
 
 JWT_SECRET = os.getenv("JWT_SECRET", "fallback_secret_key")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRE_HOURS = int(os.getenv("JWT_EXPIRE_HOURS", "24"))
 
+# Resolved principals are cached per token to skip the users lookup on every request
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Trust the signed uid/name/role claims and never hit the users collection
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+
+class PrincipalCache:
+    """Bounded LRU of token -> principal with per-entry expiry and per-email invalidation"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._tokens_by_email = {}
+        self._lock = threading.Lock()
+    
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                self._discard(token)
+                return None
+            self._entries.move_to_end(token)
+            return principal
+    
+    def put(self, token: str, principal: dict, token_exp: float = None):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            # Never outlive the token itself
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        
+        with self._lock:
+            self._discard(token)
+            self._entries[token] = (time.monotonic() + ttl, principal)
+            self._tokens_by_email.setdefault(principal["email"], set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+    
+    def invalidate_email(self, email: str) -> int:
+        with self._lock:
+            tokens = self._tokens_by_email.pop(email, set())
+            for token in tokens:
+                self._entries.pop(token, None)
+            return len(tokens)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_email.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _discard(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_email.get(entry[1]["email"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_email[entry[1]["email"]]
+
+principal_cache = PrincipalCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_user(email: str):
+    """Drop cached principals for a user; call after role/district changes or (re)signup"""
+    if principal_cache.invalidate_email(email):
+        metrics.increment("auth_cache_invalidations")
+
+def principal_claims(user: dict) -> dict:
+    """Token claims describing the user, enough to rebuild the principal in stateless mode"""
+    return {"sub": user["email"], "uid": str(user["_id"]), "name": user["name"], "role": user["role"]}
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_password_op(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(password_executor, fn, *args)
+
+async def hash_password_async(password: str) -> str:
+    """get_password_hash on the dedicated bcrypt executor"""
+    return await _run_password_op(pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Verify on the bcrypt executor; returns (valid, new_hash) where new_hash is set when the cost factor changed"""
+    return await _run_password_op(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -40,8 +151,14 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    token = credentials.credentials
+    cached = principal_cache.get(token)
+    if cached is not None:
+        metrics.increment("auth_cache_hits")
+        return dict(cached)
+    
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         email: str = payload.get("sub")
         role: str = payload.get("role")
         if email is None:
@@ -49,14 +166,21 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
+    if AUTH_STATELESS and all(payload.get(claim) for claim in ("uid", "name", "role")):
+        metrics.increment("auth_stateless_principals")
+        return {"id": payload["uid"], "email": email, "name": payload["name"], "role": role}
+    
+    metrics.increment("auth_cache_misses")
     db = await get_database()
-    user = await db.users.find_one({"email": email})
+    user = await db.users.find_one({"email": email}, {"email": 1, "name": 1, "role": 1})
     if user is None:
         raise credentials_exception
     
-    return {
+    principal = {
         "id": str(user["_id"]),
         "email": user["email"],
         "name": user["name"],
         "role": user["role"]
-    }
\ No newline at end of file
+    }
+    principal_cache.put(token, principal, payload.get("exp"))
+    return dict(principal)
\ No newline at end of file
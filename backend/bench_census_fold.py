@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-pass CensusAccumulator vs per-field generator sums
+Rows come from the real PCA_SC11xx spreadsheets, replicated to 1M rows
+Usage: python bench_census_fold.py [--rows 1000000]
+"""
+
+import argparse
+import time
+from pathlib import Path
+import pandas as pd
+
+from census_stats import CensusAccumulator, CENSUS_FIELDS
+
+DATA_DIR = Path(__file__).parent.parent / "data" / "sikkim"
+
+def load_rows():
+    """Read every PCA_SC11xx workbook (CSV exports as a fallback) into plain dicts"""
+    frames = [pd.read_excel(path, engine="openpyxl") for path in sorted(DATA_DIR.glob("PCA_SC11*.xlsx"))]
+    if not frames:
+        frames = [pd.read_csv(path) for path in sorted((DATA_DIR / "csv").glob("PCA_SC11*.csv"))]
+    return pd.concat(frames, ignore_index=True).to_dict(orient="records")
+
+def per_field_sums(docs):
+    """The previous approach: one full pass and int() per field"""
+    return {key: sum(int(doc.get(field, 0)) for doc in docs) for key, field in CENSUS_FIELDS.items()}
+
+def single_pass(docs):
+    return CensusAccumulator().update(docs).result()
+
+def best_of(fn, docs, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(docs)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the census statistics fold")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = load_rows()
+    docs = (base * (args.rows // len(base) + 1))[:args.rows]
+    print(f"📖 Loaded {len(base)} census rows, replicated to {len(docs):,}")
+
+    naive_time, naive = best_of(per_field_sums, docs, args.repeat)
+    fold_time, folded = best_of(single_pass, docs, args.repeat)
+
+    assert all(folded[key] == naive[key] for key in CENSUS_FIELDS), "totals differ"
+    print(f"   per-field sums ({len(CENSUS_FIELDS)} passes): {naive_time * 1000:8.1f} ms")
+    print(f"   CensusAccumulator (1 pass):  {fold_time * 1000:8.1f} ms")
+    print(f"   speedup: {naive_time / fold_time:.2f}x")
+
+if __name__ == "__main__":
+    main()
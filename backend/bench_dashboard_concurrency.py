@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Concurrency load test for GET /api/dashboard/state on unified_system.py
+Fires the same number of requests at increasing concurrency levels and reports
+throughput and latency; with non-blocking endpoints throughput grows with
+concurrency until the DB thread pool / mongod saturates.
+
+Start the server against a local mongod first:
+  MONGO_URI=mongodb://localhost:27017 uvicorn unified_system:app --port 8004
+Usage: python bench_dashboard_concurrency.py [--url http://localhost:8004] [--requests 200] [--levels 1,10,50,200]
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from pymongo import MongoClient
+
+from auth import create_access_token
+
+BENCH_EMAIL = "bench-state@example.com"
+
+_local = threading.local()
+
+def seed_state_user(uri: str) -> str:
+    """Ensure a state officer exists in the auth database and return a bearer token for it"""
+    client = MongoClient(uri)
+    client.ruraliq.users.update_one(
+        {"email": BENCH_EMAIL},
+        {"$setOnInsert": {
+            "name": "Bench State Officer",
+            "email": BENCH_EMAIL,
+            "role": "state",
+            "created_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    client.close()
+    return create_access_token(data={"sub": BENCH_EMAIL})
+
+def fetch_dashboard(url: str, token: str):
+    # One keep-alive session per worker thread
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+
+    start = time.perf_counter()
+    response = session.get(f"{url}/api/dashboard/state", headers={"Authorization": f"Bearer {token}"}, timeout=60)
+    return response.status_code, time.perf_counter() - start
+
+def run_level(url: str, token: str, total: int, concurrency: int) -> dict:
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(lambda _: fetch_dashboard(url, token), range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "concurrency": concurrency,
+        "errors": sum(1 for status_code, _ in results if status_code != 200),
+        "throughput": total / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /api/dashboard/state at increasing concurrency")
+    parser.add_argument("--url", default="http://localhost:8004")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="MongoDB holding the auth users")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--levels", default="1,10,50,200", help="Comma separated concurrency levels")
+    args = parser.parse_args()
+
+    token = seed_state_user(args.uri)
+    levels = [int(level) for level in args.levels.split(",")]
+
+    # Warm up connections and caches
+    fetch_dashboard(args.url, token)
+
+    print("🏁 /api/dashboard/state concurrency load test")
+    print("=" * 68)
+    print(f"{'concurrency':>11} | {'req/s':>8} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'errors':>6} | {'scaling':>7}")
+    print("-" * 68)
+
+    baseline = None
+    for concurrency in levels:
+        row = run_level(args.url, token, max(args.requests, concurrency), concurrency)
+        baseline = baseline or row["throughput"]
+        print(f"{row['concurrency']:>11} | {row['throughput']:>8.1f} | {row['p50']:>9.1f} | {row['p95']:>9.1f} | "
+              f"{row['errors']:>6} | {row['throughput'] / baseline:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: scalar score_village_gaps loop vs vectorized score_gaps_batch
+Synthetic villages mix int and float amenity values and cover every threshold
+branch; outputs are compared field by field (messages, status, priority and
+severity_score) before timings are reported
+Usage: python bench_gap_scoring.py [--sizes 10000 100000 600000]
+"""
+
+import argparse
+import gc
+import random
+import time
+from datetime import datetime
+from bson import ObjectId
+
+from gap_detection import score_village_gaps
+from gap_batch import score_gaps_batch
+
+def make_villages(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    villages, amenities_list = [], []
+    for _ in range(count):
+        village = {"_id": ObjectId()}
+        if rng.random() > 0.05:
+            village["population"] = rng.choice([rng.randint(50, 20000), float(rng.randint(50, 20000))])
+        amenities = {
+            "water": rng.choice([0, 1, 1, 1]),
+            "electricity": rng.choice([rng.randint(0, 100), round(rng.uniform(0, 100), 1)]),
+            "schools": rng.randint(0, 12),
+            "health_centers": rng.randint(0, 4),
+            "toilets": rng.choice([rng.randint(0, 100), round(rng.uniform(0, 100), 2)]),
+            "internet": rng.randint(0, 100),
+        }
+        if rng.random() < 0.05:
+            amenities.pop(rng.choice(list(amenities)))
+        villages.append(village)
+        amenities_list.append(amenities)
+    return villages, amenities_list
+
+def scalar(villages, amenities_list, now):
+    results = []
+    for village, amenities in zip(villages, amenities_list):
+        gaps = score_village_gaps(village, amenities)
+        gaps["last_updated"] = now
+        results.append(gaps)
+    return results
+
+def vectorized(villages, amenities_list, now):
+    return score_gaps_batch(villages, amenities_list, now)
+
+def best_of(fn, args, repeat):
+    # Like timeit: keep cyclic GC passes over the retained results out of the timings
+    timings = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn(*args)
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized gap scoring")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 600_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("🚀 Gap scoring: scalar vs vectorized")
+    print("=" * 60)
+    now = datetime.utcnow()
+    for size in args.sizes:
+        villages, amenities_list = make_villages(size)
+        scalar_time, expected = best_of(scalar, (villages, amenities_list, now), args.repeat)
+        batch_time, actual = best_of(vectorized, (villages, amenities_list, now), args.repeat)
+
+        assert actual == expected, "vectorized output differs from score_village_gaps"
+        print(f"📊 {size:,} villages (outputs identical)")
+        print(f"   scalar:     {scalar_time * 1000:9.1f} ms  ({size / scalar_time:,.0f} villages/s)")
+        print(f"   vectorized: {batch_time * 1000:9.1f} ms  ({size / batch_time:,.0f} villages/s)")
+        print(f"   speedup: {scalar_time / batch_time:.2f}x")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark the report image processing stage on synthetic phone-sized photos
+Reports bytes in vs bytes stored (image + thumbnail), per-image latency, and
+throughput serially vs through the process pool; also checks that only the
+GPS block of the EXIF metadata survives
+Usage: python bench_image_processing.py [--images 16] [--width 4000] [--height 3000]
+"""
+
+import argparse
+import asyncio
+import io
+import time
+
+from PIL import Image, ExifTags
+
+import image_processing
+
+def make_photo(width: int, height: int, seed: int) -> bytes:
+    """Noisy JPEG at camera quality with camera + GPS EXIF tags"""
+    noise = Image.effect_noise((width, height), 60 + seed % 20).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    photo = Image.blend(noise, gradient, 0.5)
+
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = "BenchPhone"
+    exif[ExifTags.Base.Model] = "Model X"
+    exif[ExifTags.Base.Orientation] = 1
+    exif[ExifTags.IFD.GPSInfo] = {
+        ExifTags.GPS.GPSLatitudeRef: "N",
+        ExifTags.GPS.GPSLatitude: (27.0, 19.0, 48.0),
+        ExifTags.GPS.GPSLongitudeRef: "E",
+        ExifTags.GPS.GPSLongitude: (88.0, 36.0, 36.0),
+    }
+
+    buffer = io.BytesIO()
+    photo.save(buffer, "JPEG", quality=95, exif=exif.tobytes())
+    return buffer.getvalue()
+
+def check_metadata(processed: dict):
+    with Image.open(io.BytesIO(processed["image"])) as image:
+        exif = image.getexif()
+        assert ExifTags.Base.Make not in exif, "camera EXIF should be stripped"
+        assert exif.get_ifd(ExifTags.IFD.GPSInfo), "GPS EXIF should be kept"
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark report image processing")
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    args = parser.parse_args()
+
+    photos = [make_photo(args.width, args.height, i) for i in range(args.images)]
+    total_in = sum(len(photo) for photo in photos)
+
+    print("🏁 Report image processing benchmark")
+    print("=" * 60)
+    print(f"🖼️ {args.images} photos {args.width}x{args.height}, avg {total_in / len(photos) / 1e6:.2f} MB "
+          f"-> {image_processing.IMAGE_FORMAT} max {image_processing.IMAGE_MAX_DIMENSION}px q{image_processing.IMAGE_QUALITY}")
+
+    start = time.perf_counter()
+    results = [image_processing.process_image(photo) for photo in photos]
+    serial = time.perf_counter() - start
+    check_metadata(results[0])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(image_processing.process_image_async(photo) for photo in photos))
+    pooled = time.perf_counter() - start
+    image_processing.shutdown_pool()
+
+    total_out = sum(result["stored_bytes"] for result in results)
+    print(f"📦 Bytes: {total_in / 1e6:.1f} MB in -> {total_out / 1e6:.2f} MB stored ({total_in / total_out:.1f}x smaller)")
+    print(f"⏱️ Serial: {serial / args.images * 1000:.0f} ms/image, {args.images / serial:.1f} images/s")
+    print(f"⚙️ Pool ({image_processing.IMAGE_PROCESS_WORKERS} workers): {args.images / pooled:.1f} images/s")
+    print("✅ Only GPS metadata kept")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark login throughput under concurrency with bcrypt on vs off the event loop
+Each simulated login verifies a password hashed at BCRYPT_ROUNDS; a ticker task
+measures the worst event-loop stall while the logins run
+Usage: BCRYPT_ROUNDS=12 python bench_login_throughput.py [--logins 32] [--levels 1,8,32]
+"""
+
+import argparse
+import asyncio
+import time
+
+import auth
+
+PASSWORD = "correct horse battery staple"
+
+async def inline_login(hashed):
+    # Old behaviour: passlib called directly inside the async handler
+    await asyncio.sleep(0)
+    assert auth.verify_password(PASSWORD, hashed)
+
+async def offloaded_login(hashed):
+    await asyncio.sleep(0)
+    valid, _ = await auth.verify_and_update_password(PASSWORD, hashed)
+    assert valid
+
+async def max_loop_stall(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, time.perf_counter() - start - 0.005)
+    return worst
+
+async def run(login, hashed, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await login(hashed)
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(max_loop_stall(stop))
+    await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    return total / elapsed, await ticker * 1000
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput with bcrypt offloading")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--levels", default="1,8,32", help="Comma separated concurrency levels")
+    args = parser.parse_args()
+
+    hashed = auth.get_password_hash(PASSWORD)
+    print("🏁 Login throughput benchmark")
+    print("=" * 72)
+    print(f"🔐 bcrypt rounds {auth.BCRYPT_ROUNDS}, {auth.PASSWORD_HASH_WORKERS} hash workers, {args.logins} logins per level")
+    print(f"{'concurrency':>11} | {'inline logins/s':>15} | {'stall (ms)':>10} | {'offloaded logins/s':>18} | {'stall (ms)':>10}")
+    print("-" * 72)
+
+    for concurrency in [int(level) for level in args.levels.split(",")]:
+        inline_rate, inline_stall = await run(inline_login, hashed, args.logins, concurrency)
+        offloaded_rate, offloaded_stall = await run(offloaded_login, hashed, args.logins, concurrency)
+        print(f"{concurrency:>11} | {inline_rate:>15.1f} | {inline_stall:>10.1f} | {offloaded_rate:>18.1f} | {offloaded_stall:>10.1f}")
+
+    auth.password_executor.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Randomized consistency check and timing for the in-process recommendation heaps
+Seeds village_priority with synthetic entries, then runs random rescoring steps
+through village_priority.write_priorities (severity changes, district moves, new
+villages). After every step each heap answer is compared with the index read
+(village_priority.top_villages) it replaces; a miss reseeds like
+/api/recommendations does. Reports hit rate and heap vs index read latency.
+
+Usage: python bench_priority_heap.py [--uri mongodb://localhost:27017] [--villages 2000] [--steps 300]
+       python bench_priority_heap.py --mock      # mongomock_motor instead of a mongod (check only;
+                                                 # its index read latency is not representative)
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import priority_heap
+from village_priority import ensure_priority_indexes, top_villages, write_priorities, VILLAGE_PRIORITY
+
+def make_entry(rng, village_id: str, district: str) -> dict:
+    return {
+        "village_id": village_id,
+        "name": f"Village {village_id}",
+        "state": "Bench State",
+        "district": district,
+        "population": rng.randint(100, 20000),
+        # Coarse scores so ties (broken by village_id) are common
+        "severity_score": round(rng.uniform(0, 100) / 5) * 5.0,
+        "gap_count": rng.randint(0, 6),
+        "gaps": {},
+        # Millisecond precision, as stored by MongoDB
+        "last_updated": datetime.utcnow().replace(microsecond=0),
+    }
+
+def ranking(rows: list) -> list:
+    return [(row["village_id"], row["severity_score"]) for row in rows]
+
+async def recommend(db, district, limit, stats):
+    """/api/recommendations without a state filter: heap first, index read + reseed on a miss"""
+    started = time.perf_counter()
+    cached = priority_heap.top(district, limit)
+    if cached is not None:
+        stats["heap_time"] += time.perf_counter() - started
+        stats["hits"] += 1
+        return cached, True
+
+    rows = await top_villages(db, max(limit, priority_heap.PRIORITY_HEAP_SIZE), district=district)
+    priority_heap.seed(district, rows)
+    stats["index_time"] += time.perf_counter() - started
+    stats["misses"] += 1
+    return rows[:limit], False
+
+async def run(db, args):
+    rng = random.Random(args.seed)
+    districts = [f"District {i}" for i in range(args.districts)]
+    entries = {}
+
+    await db[VILLAGE_PRIORITY].delete_many({})
+    await ensure_priority_indexes(db)
+    priority_heap.clear()
+    initial = [make_entry(rng, f"v{i:06d}", rng.choice(districts)) for i in range(args.villages)]
+    await write_priorities(db, initial)
+    entries.update((entry["village_id"], entry) for entry in initial)
+    await priority_heap.seed_all(db)
+
+    stats = {"hits": 0, "misses": 0, "heap_time": 0.0, "index_time": 0.0, "checks": 0}
+    next_id = args.villages
+    for step in range(args.steps):
+        batch = []
+        for _ in range(rng.randint(1, 5)):
+            kind = rng.random()
+            if kind < 0.6:
+                entry = {**entries[rng.choice(list(entries))]}
+                entry["severity_score"] = round(rng.uniform(0, 100) / 5) * 5.0
+            elif kind < 0.8:
+                entry = {**entries[rng.choice(list(entries))], "district": rng.choice(districts)}
+            else:
+                entry = make_entry(rng, f"v{next_id:06d}", rng.choice(districts))
+                next_id += 1
+            entries[entry["village_id"]] = entry
+            batch.append(entry)
+        await write_priorities(db, batch)
+
+        for district in [None, *rng.sample(districts, min(3, len(districts)))]:
+            limit = rng.choice([1, 5, 10, priority_heap.PRIORITY_HEAP_SIZE])
+            answer, from_heap = await recommend(db, district, limit, stats)
+            expected = await top_villages(db, limit, district=district)
+            stats["checks"] += 1
+            if ranking(answer) != ranking(expected):
+                source = "heap" if from_heap else "index"
+                raise AssertionError(f"step {step}: {source} answer for {district!r} (limit {limit}) differs from the index")
+    return stats
+
+async def main():
+    parser = argparse.ArgumentParser(description="Check and time the recommendation heaps against the priority index")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--mock", action="store_true", help="Use mongomock_motor instead of a mongod")
+    parser.add_argument("--villages", type=int, default=2000)
+    parser.add_argument("--districts", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--heap-size", type=int, default=priority_heap.PRIORITY_HEAP_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.uri)
+    db = client.ruraliq_bench
+    priority_heap.PRIORITY_HEAP_SIZE = args.heap_size
+
+    print("🏁 Recommendation heap vs village_priority index")
+    print("=" * 60)
+    stats = await run(db, args)
+    hits, misses = stats["hits"], stats["misses"]
+    print(f"✅ {stats['checks']:,} answers over {args.steps} rescoring steps matched the index")
+    print(f"📊 heap hits: {hits:,}  misses (index read + reseed): {misses:,}  hit rate: {hits / max(hits + misses, 1):.1%}")
+    if hits and misses:
+        heap_ms = stats["heap_time"] / hits * 1000
+        index_ms = stats["index_time"] / misses * 1000
+        print(f"⏱️  heap read: {heap_ms:.3f} ms  index read: {index_ms:.3f} ms  ({index_ms / heap_ms:,.0f}x)")
+    print("=" * 60)
+
+    if not args.mock:
+        await client.drop_database("ruraliq_bench")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Verification and timing for the project approval workflow (project_workflow)
+- Every row of TRANSITIONS is applied by an allowed role and checked for its
+  status, stamp and actor fields
+- Disallowed moves are checked for their error: a role outside the row
+  (forbidden), a wrong current status (conflict), an unknown status or a
+  malformed id (invalid) and a missing project (not_found)
+- Concurrent officers race on the same projects; exactly one update may win
+  per project and its fields must be the ones stored
+- Concurrent bulk_transition calls over overlapping ids: every project is
+  reported "updated" by exactly one call, the one whose write moved it
+- bulk_transition is timed against one apply_update per project
+
+Usage: python bench_project_workflow.py [--uri mongodb://localhost:27017] [--projects 500] [--racers 8]
+       python bench_project_workflow.py --mock      # mongomock_motor instead of a mongod
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+import project_workflow
+from project_workflow import TRANSITIONS, TransitionError, apply_update, bulk_transition
+
+ROLES = ("state", "admin", "central", "district", "village")
+
+def officer(role: str) -> dict:
+    return {"id": f"bench-{role}", "name": f"Bench {role} officer", "role": role}
+
+async def insert_projects(db, status: str, count: int) -> list:
+    docs = [{"_id": ObjectId(), "name": f"Bench project {i}", "status": status, "created_at": datetime.utcnow()}
+            for i in range(count)]
+    if docs:
+        await db.projects.insert_many(docs)
+    return [str(doc["_id"]) for doc in docs]
+
+async def expect_error(reason: str, coro):
+    try:
+        await coro
+    except TransitionError as e:
+        assert e.reason == reason, f"expected {reason}, got {e.reason}: {e.detail}"
+        return
+    raise AssertionError(f"expected {reason}, the update was applied")
+
+async def check_transitions(db) -> int:
+    checks = 0
+    for (source, target), rule in TRANSITIONS.items():
+        roles = sorted(rule["roles"]) if rule["roles"] else list(ROLES)
+        for role in roles:
+            [project_id] = await insert_projects(db, source, 1)
+            project = await apply_update(db, project_id, {"status": target, "rejection_reason": "bench"}, officer(role))
+            assert project["status"] == target, f"{source} -> {target} by {role}: {project['status']}"
+            assert project.get(rule["stamp"]), f"{source} -> {target}: {rule['stamp']} not stamped"
+            if rule.get("actor"):
+                assert project.get(rule["actor"]) == officer(role)["name"], f"{source} -> {target}: wrong actor"
+            checks += 1
+
+        for role in ROLES:
+            if rule["roles"] is not None and role not in rule["roles"]:
+                [project_id] = await insert_projects(db, source, 1)
+                if not project_workflow.allowed_sources(role, target):
+                    await expect_error("forbidden", apply_update(db, project_id, {"status": target}, officer(role)))
+                else:
+                    # The role may reach `target`, just not from `source`
+                    await expect_error("conflict", apply_update(db, project_id, {"status": target}, officer(role)))
+                checks += 1
+    return checks
+
+async def check_errors(db) -> int:
+    [project_id] = await insert_projects(db, "pending_state", 1)
+    await expect_error("conflict", apply_update(db, project_id, {"status": "completed"}, officer("admin")))
+    await expect_error("invalid", apply_update(db, project_id, {"status": "launched"}, officer("admin")))
+    await expect_error("invalid", apply_update(db, project_id, {"status": ["approved"]}, officer("admin")))
+    await expect_error("invalid", apply_update(db, "not-an-id", {"status": "pending_admin"}, officer("state")))
+    await expect_error("not_found", apply_update(db, str(ObjectId()), {"status": "pending_admin"}, officer("state")))
+    await expect_error("invalid", bulk_transition(db, [project_id], {"status": "launched"}, officer("admin")))
+    await expect_error("forbidden", bulk_transition(db, [project_id], {"status": "approved"}, officer("state")))
+    return 7
+
+async def check_races(db, projects: int, racers: int, rng) -> int:
+    """Admin/central officers approve or reject the same pending_admin projects at once"""
+    project_ids = await insert_projects(db, "pending_admin", projects)
+    attempts = []
+    for project_id in project_ids:
+        for _ in range(racers):
+            target = rng.choice(["approved", "rejected"])
+            budget = rng.randint(1, 10) * 100000
+            attempts.append((project_id, target, budget, rng.choice(["admin", "central"])))
+    rng.shuffle(attempts)
+
+    async def attempt(project_id, target, budget, role):
+        update = {"status": target, "approved_budget": budget, "rejection_reason": f"bench {budget}"}
+        try:
+            return project_id, target, budget, await apply_update(db, project_id, update, officer(role))
+        except TransitionError as e:
+            assert e.reason == "conflict", f"race lost with {e.reason}: {e.detail}"
+            return project_id, target, budget, None
+
+    winners = {}
+    for project_id, target, budget, project in await asyncio.gather(*(attempt(*a) for a in attempts)):
+        if project is not None:
+            assert project_id not in winners, f"{project_id}: two concurrent updates both won"
+            winners[project_id] = (target, budget)
+
+    assert set(winners) == set(project_ids), "a raced project was left unchanged"
+    async for project in db.projects.find({"_id": {"$in": [ObjectId(p) for p in project_ids]}}):
+        target, budget = winners[str(project["_id"])]
+        assert project["status"] == target, f"{project['_id']}: stored {project['status']}, winner set {target}"
+        if target == "approved":
+            assert project["approved_budget"] == budget, f"{project['_id']}: budget of a losing update stored"
+        else:
+            assert project["rejection_reason"] == f"bench {budget}", f"{project['_id']}: reason of a losing update stored"
+    return len(attempts)
+
+async def check_bulk_races(db, projects: int, callers: int, rng) -> int:
+    """Several state officers forward overlapping batches of the same projects at once"""
+    project_ids = await insert_projects(db, "pending_state", projects)
+    batches = [rng.sample(project_ids, max(1, len(project_ids) * 2 // 3)) for _ in range(callers)]
+    calls = await asyncio.gather(*(
+        bulk_transition(db, batch, {"status": "pending_admin"}, officer("state")) for batch in batches
+    ))
+
+    wins = {}
+    for results in calls:
+        for result in results:
+            assert result["outcome"] in ("updated", "conflict"), f"unexpected outcome {result}"
+            if result["outcome"] == "updated":
+                wins[result["project_id"]] = wins.get(result["project_id"], 0) + 1
+    requested = set().union(*batches)
+    assert set(wins) == requested, "a requested project was not updated by any call"
+    assert all(count == 1 for count in wins.values()), "a project was reported updated by two calls"
+    return sum(len(batch) for batch in batches)
+
+async def time_paths(db, projects: int) -> tuple:
+    single_ids = await insert_projects(db, "pending_state", projects)
+    started = time.perf_counter()
+    for project_id in single_ids:
+        await apply_update(db, project_id, {"status": "pending_admin"}, officer("state"))
+    single = time.perf_counter() - started
+
+    bulk_ids = await insert_projects(db, "pending_state", projects)
+    started = time.perf_counter()
+    for offset in range(0, len(bulk_ids), project_workflow.BULK_TRANSITION_MAX):
+        results = await bulk_transition(
+            db, bulk_ids[offset:offset + project_workflow.BULK_TRANSITION_MAX], {"status": "pending_admin"}, officer("state")
+        )
+        assert all(result["outcome"] == "updated" for result in results), "bulk transition left projects behind"
+    bulk = time.perf_counter() - started
+    return single, bulk
+
+async def main():
+    parser = argparse.ArgumentParser(description="Verify and time project workflow transitions")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--mock", action="store_true", help="Use mongomock_motor instead of a mongod")
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--racers", type=int, default=8, help="Concurrent officers per raced project")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.uri)
+    db = client.ruraliq_bench
+    await db.projects.delete_many({})
+    rng = random.Random(args.seed)
+
+    print("🏁 Project workflow transitions")
+    print("=" * 60)
+    print(f"✅ {await check_transitions(db)} allowed/disallowed transitions behave as TRANSITIONS says")
+    print(f"✅ {await check_errors(db)} invalid, not_found and conflict cases rejected")
+    raced = await check_races(db, min(args.projects, 100), args.racers, rng)
+    print(f"✅ {raced} concurrent updates: exactly one winner per project, its fields stored")
+    bulk_raced = await check_bulk_races(db, min(args.projects, 200), args.racers, rng)
+    print(f"✅ {bulk_raced} ids in {args.racers} concurrent bulk calls: each project updated by exactly one call")
+    single, bulk = await time_paths(db, args.projects)
+    print(f"📊 {args.projects} projects pending_state -> pending_admin")
+    print(f"   apply_update per project: {single * 1000:9.1f} ms")
+    print(f"   bulk_transition:          {bulk * 1000:9.1f} ms  ({single / bulk:.1f}x)")
+    print("=" * 60)
+
+    if not args.mock:
+        await client.drop_database("ruraliq_bench")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
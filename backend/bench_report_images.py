@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark POST /api/reports with images against a local mongod
+Compares the old inline upload (blocking the event loop) with the new path,
+which persists the report as pending and stores the image in the background.
+Uses the local storage backend with an optional simulated upload latency.
+Usage: python bench_report_images.py [--uri mongodb://localhost:27017] [--reports 200] [--latency-ms 150]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from fastapi import BackgroundTasks, UploadFile
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import image_storage
+import main
+
+IMAGE_BYTES = os.urandom(512 * 1024)
+
+class SlowLocalStorage(image_storage.LocalImageStorage):
+    """Local backend that also waits like a remote upload would"""
+
+    def __init__(self, root, latency):
+        super().__init__(root, "/media/bench")
+        self.latency = latency
+
+    def save(self, data, filename=None, content_type=None):
+        time.sleep(self.latency)
+        return super().save(data, filename, content_type)
+
+async def inline_report(db, user):
+    # Old behaviour: blocking upload on the event loop before the insert
+    image_url = image_storage.get_storage().save(IMAGE_BYTES, "photo.jpg")
+    await db.reports.insert_one({
+        "user_id": user["id"],
+        "village_id": "bench-village",
+        "description": "Benchmark report",
+        "gps": {"lat": 27.33, "long": 88.61},
+        "image_url": image_url,
+        "timestamp": datetime.utcnow(),
+        "synced": True
+    })
+
+async def background_report(db, user, tasks):
+    background = BackgroundTasks()
+    await main.create_report(
+        "bench-village", "Benchmark report", 27.33, 88.61, background,
+        UploadFile(io.BytesIO(IMAGE_BYTES), filename="photo.jpg"), user
+    )
+    tasks.append(asyncio.create_task(background()))
+
+async def run(label, fn, count):
+    start = time.perf_counter()
+    await asyncio.gather(*(fn() for _ in range(count)))
+    responded = time.perf_counter() - start
+    return label, count / responded
+
+async def main_async():
+    parser = argparse.ArgumentParser(description="Benchmark report creation with image uploads")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=150, help="Simulated storage upload latency")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.uri)
+    db = client.ruraliq_bench
+    user = {"id": "bench-user"}
+
+    async def bench_db():
+        return db
+    main.get_database = bench_db
+
+    with tempfile.TemporaryDirectory() as root:
+        image_storage.set_storage(SlowLocalStorage(root, args.latency_ms / 1000))
+
+        print("🏁 Report image upload benchmark")
+        print("=" * 60)
+        print(f"🖼️ {args.reports} concurrent reports, {len(IMAGE_BYTES) // 1024} KB images, {args.latency_ms:.0f} ms storage latency")
+
+        label, inline_rate = await run("inline upload", lambda: inline_report(db, user), args.reports)
+        print(f"{label:>20} | {inline_rate:>8.1f} reports/s (image stored before response)")
+
+        tasks = []
+        start = time.perf_counter()
+        label, background_rate = await run("background upload", lambda: background_report(db, user, tasks), args.reports)
+        await asyncio.gather(*tasks)
+        stored_rate = args.reports / (time.perf_counter() - start)
+        print(f"{label:>20} | {background_rate:>8.1f} reports/s to response, {stored_rate:.1f} reports/s to image stored")
+
+        pending = await db.reports.count_documents({"image_status": "pending"})
+        print(f"🚀 Response throughput: {background_rate / inline_rate:.1f}x, pending after drain: {pending}")
+
+    await client.drop_database("ruraliq_bench")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
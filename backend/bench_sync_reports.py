@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/sync/reports batch ingest against a local mongod
+Compares the old find_one + insert_one loop with report_sync.insert_reports
+for a fresh batch and for a full re-send of the same batch (all duplicates)
+Usage: python bench_sync_reports.py [--uri mongodb://localhost:27017] [--reports 1000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from database import ensure_indexes
+from report_sync import insert_reports
+
+def make_batch(count: int, run: int) -> list:
+    return [
+        {
+            "village_id": f"village-{i % 50}",
+            "description": f"Benchmark report {i}",
+            "gps_lat": 27.33,
+            "gps_long": 88.61,
+            "client_id": f"offline_bench_{run}_{i}",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        for i in range(count)
+    ]
+
+async def per_report(db, reports, user_id):
+    processed = []
+    for report_data in reports:
+        report_data["user_id"] = user_id
+        report_data["synced"] = True
+        report_data["sync_timestamp"] = datetime.utcnow()
+        existing = await db.reports.find_one({"client_id": report_data["client_id"]})
+        if existing:
+            processed.append({"client_id": report_data["client_id"], "status": "duplicate"})
+            continue
+        result = await db.reports.insert_one(report_data)
+        processed.append({"client_id": report_data["client_id"], "id": str(result.inserted_id), "status": "success"})
+    return processed
+
+async def time_sync(fn, db, count, repeat, run_offset):
+    fresh, resend = [], []
+    for run in range(repeat):
+        batch = make_batch(count, run_offset + run)
+
+        start = time.perf_counter()
+        processed = await fn(db, [dict(report) for report in batch], "bench-user")
+        fresh.append(time.perf_counter() - start)
+        assert all(p["status"] == "success" for p in processed)
+
+        start = time.perf_counter()
+        processed = await fn(db, [dict(report) for report in batch], "bench-user")
+        resend.append(time.perf_counter() - start)
+        assert all(p["status"] == "duplicate" for p in processed)
+    return min(fresh) * 1000, min(resend) * 1000
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline report batch sync")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--reports", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.uri)
+    db = client.ruraliq_bench
+    await db.reports.delete_many({})
+    await ensure_indexes(db)
+
+    print("🏁 /api/sync/reports batch benchmark")
+    print("=" * 60)
+    print(f"📨 {args.reports:,} reports per batch, best of {args.repeat}")
+    print(f"{'path':>22} | {'fresh batch (ms)':>16} | {'re-send (ms)':>13}")
+    print("-" * 60)
+
+    loop_fresh, loop_resend = await time_sync(per_report, db, args.reports, args.repeat, 0)
+    print(f"{'find_one + insert_one':>22} | {loop_fresh:>16.1f} | {loop_resend:>13.1f}")
+    bulk_fresh, bulk_resend = await time_sync(insert_reports, db, args.reports, args.repeat, args.repeat)
+    print(f"{'$in + insert_many':>22} | {bulk_fresh:>16.1f} | {bulk_resend:>13.1f}")
+    print(f"🚀 Speedup: {loop_fresh / bulk_fresh:.1f}x fresh, {loop_resend / bulk_resend:.1f}x re-send")
+
+    await client.drop_database("ruraliq_bench")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/upload_village_data ingest throughput against a local mongod
+Compares the old iterrows + find_one/update_one/insert_one loop with the
+column-wise conversion and chunked bulk upserts in village_ingest.py
+Usage: python bench_village_ingest.py [--uri mongodb://localhost:27017] [--rows 10000] [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import pandas as pd
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from database import ensure_indexes
+from village_ingest import frame_to_villages, bulk_upsert_villages
+
+def make_frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "name": [f"Village {i}" for i in range(rows)],
+        "population": [1000 + i % 5000 for i in range(rows)],
+        "state": "Bench State",
+        "district": [f"District {i % 20}" for i in range(rows)],
+        "sc_ratio": 25.0,
+        "water": [i % 2 for i in range(rows)],
+        "electricity": 60.0,
+        "schools": 1,
+        "health_centers": 0,
+        "toilets": 55.0,
+        "internet": 20.0,
+    })
+
+async def row_by_row(db, df, batch_size):
+    created = updated = 0
+    for _, row in df.iterrows():
+        village_data = {
+            "name": row.get('name'),
+            "population": int(row.get('population', 0)),
+            "state": row.get('state'),
+            "district": row.get('district'),
+            "sc_ratio": float(row.get('sc_ratio', 0)),
+            "amenities": {
+                "water": int(row.get('water', 0)),
+                "electricity": float(row.get('electricity', 0)),
+                "schools": int(row.get('schools', 0)),
+                "health_centers": int(row.get('health_centers', 0)),
+                "toilets": float(row.get('toilets', 0)),
+                "internet": float(row.get('internet', 0))
+            },
+            "updated_at": datetime.utcnow()
+        }
+        existing_village = await db.villages.find_one({
+            "name": village_data["name"],
+            "district": village_data["district"],
+            "state": village_data["state"]
+        })
+        if existing_village:
+            await db.villages.update_one({"_id": existing_village["_id"]}, {"$set": village_data})
+            updated += 1
+        else:
+            village_data["created_at"] = datetime.utcnow()
+            await db.villages.insert_one(village_data)
+            created += 1
+    return created, updated
+
+async def bulk(db, df, batch_size):
+    return await bulk_upsert_villages(db, frame_to_villages(df), batch_size)
+
+async def time_ingest(fn, db, df, batch_size):
+    """Time a cold upload (all inserts) followed by a re-upload (all updates)"""
+    await db.villages.delete_many({})
+    timings = []
+    for expected in ("created", "updated"):
+        start = time.perf_counter()
+        created, updated = await fn(db, df, batch_size)
+        timings.append(len(df) / (time.perf_counter() - start))
+        assert (created if expected == "created" else updated) == len(df)
+    return timings
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark village upload ingest throughput")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.uri)
+    db = client.ruraliq_bench
+    await ensure_indexes(db)
+    df = make_frame(args.rows)
+
+    print("🏁 Village upload ingest benchmark")
+    print("=" * 60)
+    print(f"📄 {args.rows:,} rows, bulk batch size {args.batch_size:,}")
+    print(f"{'path':>22} | {'insert rows/s':>14} | {'update rows/s':>14}")
+    print("-" * 60)
+
+    results = {}
+    for label, fn in (("iterrows + find_one", row_by_row), ("bulk upsert", bulk)):
+        results[label] = await time_ingest(fn, db, df, args.batch_size)
+        insert_rate, update_rate = results[label]
+        print(f"{label:>22} | {insert_rate:>14,.0f} | {update_rate:>14,.0f}")
+
+    old, new = results["iterrows + find_one"], results["bulk upsert"]
+    print(f"🚀 Speedup: {new[0] / old[0]:.1f}x inserts, {new[1] / old[1]:.1f}x updates")
+
+    await client.drop_database("ruraliq_bench")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/villages amenities join against a local mongod
+Compares the old per-village find_one loop with the batched $in query
+Usage: python bench_villages_amenities.py [--uri mongodb://localhost:27017] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from database import ensure_indexes
+from main import load_amenities_map, build_village_response
+
+PAGE_SIZES = [100, 1000, 10000]
+
+async def seed(db, count):
+    """Seed `count` villages with amenities into a scratch database"""
+    await db.villages.delete_many({})
+    await db.amenities.delete_many({})
+
+    villages = [
+        {
+            "name": f"Village {i}",
+            "district": "Bench District",
+            "state": "Bench State",
+            "population": 1000 + i % 5000,
+            "sc_ratio": 25.0
+        }
+        for i in range(count)
+    ]
+    result = await db.villages.insert_many(villages)
+
+    amenities = [
+        {
+            "village_id": str(village_id),
+            "water": i % 2,
+            "electricity": 60.0,
+            "schools": 1,
+            "health_centers": 0,
+            "toilets": 55.0,
+            "internet": 20.0
+        }
+        for i, village_id in enumerate(result.inserted_ids)
+    ]
+    await db.amenities.insert_many(amenities)
+    await ensure_indexes(db)
+
+async def per_village_join(db, limit):
+    villages = await db.villages.find({}).limit(limit).to_list(length=limit)
+    result = []
+    for village in villages:
+        amenities = await db.amenities.find_one({"village_id": str(village["_id"])})
+        result.append(build_village_response(village, amenities))
+    return result
+
+async def batched_join(db, limit):
+    villages = await db.villages.find({}).limit(limit).to_list(length=limit)
+    amenities_by_village = await load_amenities_map(db, [str(village["_id"]) for village in villages])
+    return [build_village_response(village, amenities_by_village.get(str(village["_id"]))) for village in villages]
+
+async def time_request(fn, db, limit, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = await fn(db, limit)
+        timings.append(time.perf_counter() - start)
+        assert len(page) == limit
+    return min(timings) * 1000, sum(timings) / len(timings) * 1000
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /api/villages amenities join")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.uri)
+    db = client.ruraliq_bench
+
+    print("🏁 /api/villages amenities join benchmark")
+    print("=" * 60)
+    await seed(db, max(PAGE_SIZES))
+    print(f"🌱 Seeded {max(PAGE_SIZES):,} villages into 'ruraliq_bench'")
+    print(f"{'page size':>10} | {'find_one loop (ms)':>20} | {'batched $in (ms)':>18} | {'speedup':>8}")
+    print("-" * 60)
+
+    for limit in PAGE_SIZES:
+        loop_best, loop_avg = await time_request(per_village_join, db, limit, args.repeat)
+        batch_best, batch_avg = await time_request(batched_join, db, limit, args.repeat)
+        print(f"{limit:>10,} | {loop_avg:>9.1f} (min {loop_best:>6.1f}) | {batch_avg:>7.1f} (min {batch_best:>6.1f}) | {loop_avg / batch_avg:>7.1f}x")
+
+    await client.drop_database("ruraliq_bench")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
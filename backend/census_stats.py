@@ -0,0 +1,135 @@
+"""
+District statistics engine for the Sikkim census collection
+- Server-side: a single $group aggregation returns one small totals document
+  per district, whatever the village count
+- In-process: CensusAccumulator folds the same counters over documents in
+  one pass for offline tools that already hold the rows
+Both produce the same totals shape, so the rate helpers below work on either
+"""
+
+from itertools import islice
+from operator import itemgetter
+
+# Response key -> census column
+CENSUS_FIELDS = {
+    "population": "TOT_P",
+    "male": "TOT_M",
+    "female": "TOT_F",
+    "households": "No_HH_Head",
+    "literate": "P_LIT",
+    "illiterate": "P_ILL",
+    "workers": "TOT_WORK_P",
+    "main_workers": "MAINWORK_P",
+    "marginal_workers": "MARGWORK_P",
+}
+
+# Precompiled (key, column) pairs and column getters for the in-process fold
+_FIELD_PAIRS = tuple(CENSUS_FIELDS.items())
+_FIELD_GETTERS = tuple((key, itemgetter(field)) for key, field in _FIELD_PAIRS)
+FOLD_CHUNK_SIZE = 8192
+
+# Fields needed to render per-village rows
+VILLAGE_PROJECTION = {
+    "_id": 0,
+    "Name": 1,
+    "Level": 1,
+    **{field: 1 for field in CENSUS_FIELDS.values()},
+}
+
+def _as_long(field: str) -> dict:
+    # Census values arrive as ints, floats or strings depending on the importer
+    return {"$convert": {"input": f"${field}", "to": "long", "onError": 0, "onNull": 0}}
+
+def district_totals_pipeline(match: dict = None, with_names: bool = False) -> list:
+    """Aggregation pipeline producing one totals document per district"""
+    stage_match = {"district_name": {"$nin": [None, ""]}}
+    if match:
+        stage_match.update(match)
+
+    projection = {"district_name": 1, **{field: 1 for field in CENSUS_FIELDS.values()}}
+    group = {"_id": "$district_name", "record_count": {"$sum": 1}}
+    for key, field in CENSUS_FIELDS.items():
+        group[key] = {"$sum": _as_long(field)}
+    if with_names:
+        projection["Name"] = 1
+        group["names"] = {"$push": {"$ifNull": ["$Name", None]}}
+
+    return [
+        {"$match": stage_match},
+        {"$project": projection},
+        {"$group": group},
+        {"$sort": {"_id": 1}},
+    ]
+
+def aggregate_district_totals(collection, match: dict = None, with_names: bool = False) -> dict:
+    """Run the totals pipeline and return {district_name: totals} sorted by district"""
+    totals = {}
+    for row in collection.aggregate(district_totals_pipeline(match, with_names)):
+        district = row.pop("_id")
+        row["district_name"] = district
+        totals[district] = row
+    return totals
+
+class CensusAccumulator:
+    """
+    Folds every census counter over documents in a single pass
+    update() reads the source once in fixed-size chunks and sums each column
+    with precompiled getters; chunks holding missing, string or float values
+    fall back to the per-document int() conversion of add()
+    """
+
+    __slots__ = ("record_count", "totals")
+
+    def __init__(self):
+        self.record_count = 0
+        self.totals = dict.fromkeys(CENSUS_FIELDS, 0)
+
+    def add(self, doc: dict):
+        self.record_count += 1
+        totals = self.totals
+        for key, field in _FIELD_PAIRS:
+            value = doc.get(field)
+            if value:
+                totals[key] += int(value)
+
+    def update(self, docs):
+        docs = iter(docs)
+        while True:
+            chunk = list(islice(docs, FOLD_CHUNK_SIZE))
+            if not chunk:
+                return self
+            if not self._add_int_columns(chunk):
+                for doc in chunk:
+                    self.add(doc)
+
+    def _add_int_columns(self, chunk: list) -> bool:
+        sums = {}
+        try:
+            for key, getter in _FIELD_GETTERS:
+                total = sum(map(getter, chunk))
+                if type(total) is not int:
+                    return False
+                sums[key] = total
+        except (KeyError, TypeError):
+            return False
+
+        self.record_count += len(chunk)
+        for key, total in sums.items():
+            self.totals[key] += total
+        return True
+
+    def result(self) -> dict:
+        return {"record_count": self.record_count, **self.totals}
+
+def rate(numerator, denominator, scale: int = 100, digits: int = 2):
+    """Ratio scaled to a percentage (or per-1000), 0 when the denominator is empty"""
+    return round((numerator / denominator * scale) if denominator > 0 else 0, digits)
+
+def literacy_rate(totals: dict):
+    return rate(totals["literate"], totals["literate"] + totals["illiterate"])
+
+def work_participation_rate(totals: dict):
+    return rate(totals["workers"], totals["population"])
+
+def gender_ratio(totals: dict):
+    return rate(totals["female"], totals["male"], scale=1000, digits=0)
@@ -1,6 +1,9 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 import os
 from dotenv import load_dotenv
+from mongo_pool import ConnectionCounter, POOL_OPTIONS
+from village_priority import ensure_priority_indexes
 
 load_dotenv()
 
@@ -9,16 +12,61 @@ database = None
 
 async def connect_to_mongo():
     global client, database
-    client = AsyncIOMotorClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    client = AsyncIOMotorClient(
+        os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+        event_listeners=[ConnectionCounter()],
+        **POOL_OPTIONS
+    )
     database = client.ruraliq
 
 async def close_mongo_connection():
-    global client
+    global client, database
     if client:
         client.close()
+        client = None
+        database = None
 
 async def get_database():
     global database
     if database is None:
         await connect_to_mongo()
-    return database
\ No newline at end of file
+    return database
+
+async def ensure_indexes(db):
+    """Create the indexes the API query paths rely on (safe to call repeatedly)"""
+    await db.amenities.create_index("village_id")
+    
+    # Keyset pagination: equality filters followed by an _id range scan
+    await db.villages.create_index([("state", 1), ("district", 1), ("_id", 1)])
+    await db.villages.create_index([("district", 1), ("_id", 1)])
+    
+    # Upload upserts are keyed on (state, district, name)
+    try:
+        await db.villages.create_index([("state", 1), ("district", 1), ("name", 1)], unique=True)
+    except OperationFailure as e:
+        print(f"⚠️ Could not create unique village index (duplicate villages?): {e}")
+    
+    # Offline sync deduplicates reports on client_id (reports without one are unconstrained)
+    try:
+        await db.reports.create_index(
+            "client_id", unique=True, partialFilterExpression={"client_id": {"$exists": True}}
+        )
+    except OperationFailure as e:
+        print(f"⚠️ Could not create unique report client_id index (duplicate reports?): {e}")
+    
+    # One gaps document per village, upserted by the gap engine
+    try:
+        await db.gaps.create_index("village_id", unique=True)
+    except OperationFailure as e:
+        print(f"⚠️ Could not create unique gaps village_id index (duplicate gaps?): {e}")
+    
+    # Report images left pending/processing are resumed at startup
+    await db.reports.create_index([("image_status", 1), ("image_claimed_at", 1)])
+    
+    await db.projects.create_index([("village_id", 1), ("_id", 1)])
+    await db.projects.create_index([("status", 1), ("_id", 1)])
+    await db.projects.create_index([("status", 1), ("created_by_district", 1), ("_id", 1)])
+    await db.projects.create_index([("village_id", 1), ("status", 1), ("_id", 1)])
+    
+    # Top-K recommendations read village_priority in severity order
+    await ensure_priority_indexes(db)
\ No newline at end of file
@@ -13,6 +13,31 @@ import uvicorn
 import json
 from datetime import datetime
 
+from gap_rules import CompiledRuleSet
+
+# The demo's SCA gap checks in the declarative rule format: its own thresholds and
+# its critical/high/medium severities, which the demo frontend keys on
+DEMO_RULE_SET = CompiledRuleSet({
+    "_id": "demo",
+    "village_rules": [
+        {"key": "water", "kind": "binary", "field": "water", "equals": 0, "weight": 0,
+         "status": [{"value": "critical"}], "priority": [{"value": "high"}],
+         "message": "No clean water access"},
+        {"key": "healthcare", "kind": "binary", "field": "health_centers", "equals": 0, "weight": 0,
+         "status": [{"value": "critical"}], "priority": [{"value": "high"}],
+         "message": "No healthcare facility"},
+        {"key": "education", "kind": "binary", "field": "schools", "equals": 0, "weight": 0,
+         "status": [{"value": "high"}], "priority": [{"value": "high"}],
+         "message": "No educational facility"},
+        {"key": "electricity", "kind": "coverage", "field": "electricity", "threshold": 50, "weight": 0,
+         "status": [{"value": "medium"}], "priority": [{"value": "medium"}],
+         "message": "Inadequate power supply"},
+        {"key": "sanitation", "kind": "coverage", "field": "toilets", "threshold": 40, "weight": 0,
+         "status": [{"value": "high"}], "priority": [{"value": "high"}],
+         "message": "Poor sanitation facilities"},
+    ],
+})
+
 # Create FastAPI app
 app = FastAPI(title="RuralIQ API", description="Smart village gap detection and SCA scheme management")
 
@@ -243,20 +268,12 @@ async def get_gaps(village_id: Optional[str] = None, district: Optional[str] = N
         target_villages = [v for v in sikkim_villages if v["district"] == district]
     
     for village in target_villages:
-        village_gaps = []
-        amenities = village["amenities"]
-        
-        # Critical gaps affecting SC community
-        if amenities["water"] == 0:
-            village_gaps.append({"type": "water", "severity": "critical", "description": "No clean water access"})
-        if amenities["health_centers"] == 0:
-            village_gaps.append({"type": "healthcare", "severity": "critical", "description": "No healthcare facility"})
-        if amenities["schools"] == 0:
-            village_gaps.append({"type": "education", "severity": "high", "description": "No educational facility"})
-        if amenities["electricity"] < 50:
-            village_gaps.append({"type": "electricity", "severity": "medium", "description": "Inadequate power supply"})
-        if amenities["toilets"] < 40:
-            village_gaps.append({"type": "sanitation", "severity": "high", "description": "Poor sanitation facilities"})
+        # Evaluated by the shared gap_rules engine, with the demo's own rule set
+        scored, _ = DEMO_RULE_SET.village_gaps(village, village["amenities"])
+        village_gaps = [
+            {"type": gap_type, "severity": gap["status"], "description": gap["message"]}
+            for gap_type, gap in scored.items()
+        ]
         
         if village_gaps:
             gaps.append({
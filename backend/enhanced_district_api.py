@@ -8,7 +8,9 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
+import mongo_pool
+import metrics
+import census_stats
 from datetime import datetime
 import random
 from typing import Dict, List, Any
@@ -17,14 +19,12 @@ from typing import Dict, List, Any
 load_dotenv()
 
 # Create simple FastAPI app without middleware complications
-app = FastAPI()
+app = FastAPI(lifespan=mongo_pool.lifespan)
+app.include_router(metrics.router)
 
 def get_collection():
     """Connect to MongoDB Atlas and return collection"""
-    uri = os.getenv("MONGO_URI")
-    client = MongoClient(uri)
-    db = client["sih2"]
-    return db["sikkim"]
+    return mongo_pool.get_collection("sikkim")
 
 def generate_problems_based_on_data(district_name: str, stats: Dict) -> List[Dict]:
     """Generate realistic problems based on actual district data"""
@@ -126,33 +126,39 @@ def generate_problems_based_on_data(district_name: str, stats: Dict) -> List[Dic
     
     return problems
 
-def get_district_specific_data(district_name: str) -> Dict:
+def get_district_specific_data(district_name: str, include_villages: bool = True) -> Dict:
     """Get comprehensive district-specific data including villages and problems"""
     collection = get_collection()
     
-    # Get all documents for this district
+    # District totals are computed server-side in one aggregation
     query = {"district_name": district_name}
-    docs = list(collection.find(query))
+    totals = census_stats.aggregate_district_totals(collection, query).get(district_name)
     
-    if not docs:
+    if not totals:
         raise HTTPException(status_code=404, detail=f"District '{district_name}' not found")
     
+    # Get detailed village/area information (only the fields rendered below)
+    docs = collection.find(query, census_stats.VILLAGE_PROJECTION) if include_villages else []
+    return build_district_stats(district_name, totals, docs)
+
+def build_district_stats(district_name: str, totals: Dict, docs) -> Dict:
+    """Shape aggregated district totals and per-village documents into the district response"""
     # Calculate basic statistics
-    record_count = len(docs)
-    total_pop = sum(int(doc.get('TOT_P', 0)) for doc in docs)
-    male_pop = sum(int(doc.get('TOT_M', 0)) for doc in docs)
-    female_pop = sum(int(doc.get('TOT_F', 0)) for doc in docs)
-    households = sum(int(doc.get('No_HH_Head', 0)) for doc in docs)
-    literate = sum(int(doc.get('P_LIT', 0)) for doc in docs)
-    illiterate = sum(int(doc.get('P_ILL', 0)) for doc in docs)
-    workers = sum(int(doc.get('TOT_WORK_P', 0)) for doc in docs)
-    main_workers = sum(int(doc.get('MAINWORK_P', 0)) for doc in docs)
-    marginal_workers = sum(int(doc.get('MARGWORK_P', 0)) for doc in docs)
+    record_count = totals['record_count']
+    total_pop = totals['population']
+    male_pop = totals['male']
+    female_pop = totals['female']
+    households = totals['households']
+    literate = totals['literate']
+    illiterate = totals['illiterate']
+    workers = totals['workers']
+    main_workers = totals['main_workers']
+    marginal_workers = totals['marginal_workers']
     
     # Calculate rates
-    literacy_rate = round((literate / (literate + illiterate) * 100) if (literate + illiterate) > 0 else 0, 2)
-    work_participation = round((workers / total_pop * 100) if total_pop > 0 else 0, 2)
-    gender_ratio = round((female_pop / male_pop * 1000) if male_pop > 0 else 0, 0)
+    literacy_rate = census_stats.literacy_rate(totals)
+    work_participation = census_stats.work_participation_rate(totals)
+    gender_ratio = census_stats.gender_ratio(totals)
     
     # Get detailed village/area information
     villages = []
@@ -254,12 +260,14 @@ def get_all_districts():
     """Get list of all districts with summary data"""
     try:
         collection = get_collection()
-        districts = collection.distinct("district_name")
-        districts = sorted([d for d in districts if d])
+        
+        # Totals for every district in one aggregation round trip
+        totals_by_district = census_stats.aggregate_district_totals(collection)
+        districts = list(totals_by_district)
         
         district_summaries = []
-        for district in districts:
-            stats = get_district_specific_data(district)
+        for district, totals in totals_by_district.items():
+            stats = build_district_stats(district, totals, [])
             district_summaries.append({
                 'name': district,
                 'population': stats['population']['total'],
@@ -7,21 +7,21 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
+import mongo_pool
+import metrics
+import census_stats
 from datetime import datetime
 
 # Load environment
 load_dotenv()
 
 # Create minimal FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=mongo_pool.lifespan)
+app.include_router(metrics.router)
 
 def get_collection():
     """Connect to MongoDB Atlas and return collection"""
-    uri = os.getenv("MONGO_URI")
-    client = MongoClient(uri)
-    db = client["sih2"]
-    return db["sikkim"]
+    return mongo_pool.get_collection("sikkim")
 
 @app.get("/")
 def root():
@@ -33,32 +33,19 @@ def get_all_districts():
     try:
         collection = get_collection()
         
-        # Get distinct districts
-        districts = collection.distinct("district_name")
-        districts = sorted([d for d in districts if d])
+        # Totals for every district in one aggregation round trip
+        totals_by_district = census_stats.aggregate_district_totals(collection)
+        districts = list(totals_by_district)
         
         district_data = []
         
-        for district in districts:
-            # Get actual count from database
-            docs = list(collection.find({"district_name": district}))
-            actual_count = len(docs)
-            
-            # Calculate statistics
-            total_pop = sum(int(doc.get('TOT_P', 0)) for doc in docs)
-            literate = sum(int(doc.get('P_LIT', 0)) for doc in docs)
-            illiterate = sum(int(doc.get('P_ILL', 0)) for doc in docs)
-            workers = sum(int(doc.get('TOT_WORK_P', 0)) for doc in docs)
-            
-            literacy_rate = round((literate / (literate + illiterate) * 100) if (literate + illiterate) > 0 else 0, 2)
-            work_participation = round((workers / total_pop * 100) if total_pop > 0 else 0, 2)
-            
+        for district, totals in totals_by_district.items():
             district_info = {
                 'name': district,
-                'villages_count': actual_count,  # This is the REAL count
-                'population': total_pop,
-                'literacy_rate': literacy_rate,
-                'work_participation': work_participation
+                'villages_count': totals['record_count'],  # This is the REAL count
+                'population': totals['population'],
+                'literacy_rate': census_stats.literacy_rate(totals),
+                'work_participation': census_stats.work_participation_rate(totals)
             }
             
             district_data.append(district_info)
@@ -80,29 +67,11 @@ def get_district_details(district_name: str):
     try:
         collection = get_collection()
         
-        # Get all documents for this district
-        docs = list(collection.find({"district_name": district_name}))
-        
-        if not docs:
-            raise HTTPException(status_code=404, detail=f"District '{district_name}' not found")
-        
-        # Calculate statistics
-        record_count = len(docs)  # ACTUAL count
-        total_pop = sum(int(doc.get('TOT_P', 0)) for doc in docs)
-        male_pop = sum(int(doc.get('TOT_M', 0)) for doc in docs)
-        female_pop = sum(int(doc.get('TOT_F', 0)) for doc in docs)
-        households = sum(int(doc.get('No_HH_Head', 0)) for doc in docs)
-        literate = sum(int(doc.get('P_LIT', 0)) for doc in docs)
-        illiterate = sum(int(doc.get('P_ILL', 0)) for doc in docs)
-        workers = sum(int(doc.get('TOT_WORK_P', 0)) for doc in docs)
-        
-        # Calculate rates
-        literacy_rate = round((literate / (literate + illiterate) * 100) if (literate + illiterate) > 0 else 0, 2)
-        work_participation = round((workers / total_pop * 100) if total_pop > 0 else 0, 2)
-        
-        # Get village details
+        # Single pass: fold district totals while building village rows
+        accumulator = census_stats.CensusAccumulator()
         villages = []
-        for doc in docs:
+        for doc in collection.find({"district_name": district_name}, census_stats.VILLAGE_PROJECTION):
+            accumulator.add(doc)
             village = {
                 'name': doc.get('Name', 'Unknown'),
                 'level': doc.get('Level', 'Unknown'),
@@ -112,6 +81,21 @@ def get_district_details(district_name: str):
             }
             villages.append(village)
         
+        if not villages:
+            raise HTTPException(status_code=404, detail=f"District '{district_name}' not found")
+        
+        # Calculate statistics
+        totals = accumulator.result()
+        record_count = totals['record_count']  # ACTUAL count
+        total_pop = totals['population']
+        male_pop = totals['male']
+        female_pop = totals['female']
+        households = totals['households']
+        
+        # Calculate rates
+        literacy_rate = census_stats.literacy_rate(totals)
+        work_participation = census_stats.work_participation_rate(totals)
+        
         # Sort by population
         villages.sort(key=lambda x: x['population'], reverse=True)
         
@@ -0,0 +1,180 @@
+"""
+Incremental gap recomputation engine
+- Every gaps document records the fingerprint of the inputs it was scored
+  from (population + amenities + gap rule set version) and a per-village
+  version, so editing a rule set rescores the villages it applies to
+- recompute_gaps() loads villages in batches, skips those whose fingerprint is
+  unchanged, scores the rest with gap_batch.score_gaps_batch and writes them
+  with one bulk_write per batch (plus one to the village_priority index)
+- Triggered from village uploads, report sync and village creation; optionally
+  from a MongoDB change stream (GAP_CHANGE_STREAM=true, needs a replica set)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from bson import ObjectId
+from pymongo import UpdateOne
+
+import metrics
+from gap_batch import score_gaps_batch
+from gap_rules import rule_set_for, refresh_rule_sets
+from village_priority import priority_entry, write_priorities
+
+GAP_BATCH_SIZE = int(os.getenv("GAP_BATCH_SIZE", "1000"))
+GAP_CHANGE_STREAM = os.getenv("GAP_CHANGE_STREAM", "false").lower() in ("1", "true", "yes")
+# Change events are collected for this long before one recompute runs
+GAP_CHANGE_DEBOUNCE_SECONDS = float(os.getenv("GAP_CHANGE_DEBOUNCE_SECONDS", "2"))
+
+VILLAGE_FIELDS = {"population": 1, "amenities": 1, "name": 1, "state": 1, "district": 1}
+
+def gap_inputs(village: dict, amenities: dict, rule_set) -> dict:
+    """The values the rule set reads, with the same defaults, plus the rules' name and version"""
+    return {
+        "population": village.get("population", rule_set.default_population),
+        **{field: amenities.get(field, 0) for field in rule_set.fields},
+        "rules": rule_set.tag,
+    }
+
+def input_fingerprint(village: dict, amenities: dict, rule_set=None) -> str:
+    rule_set = rule_set or rule_set_for(village.get("state"))
+    raw = json.dumps(gap_inputs(village, amenities, rule_set), sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def _object_ids(village_ids) -> list:
+    ids = []
+    for village_id in village_ids:
+        try:
+            ids.append(ObjectId(village_id))
+        except Exception:
+            continue
+    return ids
+
+async def _amenities_for(db, village_ids: list) -> dict:
+    cursor = db.amenities.find({"village_id": {"$in": village_ids}})
+    return {amenities["village_id"]: amenities async for amenities in cursor}
+
+async def _fingerprints_for(db, village_ids: list) -> dict:
+    cursor = db.gaps.find({"village_id": {"$in": village_ids}}, {"village_id": 1, "input_fingerprint": 1})
+    return {gaps["village_id"]: gaps.get("input_fingerprint") async for gaps in cursor}
+
+async def _recompute_batch(db, villages: list, force: bool, stats: dict):
+    village_ids = [str(village["_id"]) for village in villages]
+    amenities_by_village, fingerprints = await asyncio.gather(
+        _amenities_for(db, village_ids), _fingerprints_for(db, village_ids)
+    )
+
+    # Changed villages grouped by the rule set that scores them (state override or default)
+    changed = {}
+    for village, village_id in zip(villages, village_ids):
+        # The amenities collection is canonical; uploads embed amenities on the village
+        amenities = amenities_by_village.get(village_id) or village.get("amenities")
+        if not amenities:
+            stats["no_amenities"] += 1
+            continue
+
+        rule_set = rule_set_for(village.get("state"))
+        fingerprint = input_fingerprint(village, amenities, rule_set)
+        if not force and fingerprints.get(village_id) == fingerprint:
+            stats["skipped"] += 1
+            continue
+
+        group = changed.setdefault(rule_set.name, (rule_set, [], [], []))
+        group[1].append(village)
+        group[2].append(amenities)
+        group[3].append(fingerprint)
+
+    # One vectorized pass per rule set instead of scoring villages one by one
+    ops, priority_entries = [], []
+    for rule_set, group_villages, group_amenities, group_fingerprints in changed.values():
+        scored = score_gaps_batch(group_villages, group_amenities, rule_set=rule_set)
+        for village, gaps, fingerprint in zip(group_villages, scored, group_fingerprints):
+            gaps["input_fingerprint"] = fingerprint
+            ops.append(UpdateOne(
+                {"village_id": gaps["village_id"]},
+                {"$set": gaps, "$inc": {"version": 1}},
+                upsert=True
+            ))
+            priority_entries.append(priority_entry(village, gaps))
+
+    if ops:
+        await db.gaps.bulk_write(ops, ordered=False)
+        await write_priorities(db, priority_entries)
+    stats["recomputed"] += len(ops)
+
+async def recompute_gaps(db, village_ids=None, match: dict = None, force: bool = False,
+                         batch_size: int = None) -> dict:
+    """
+    Recompute gaps for the given villages (ids), the villages matching `match`,
+    or every village when both are None; unchanged inputs are skipped unless `force`
+    """
+    batch_size = batch_size or GAP_BATCH_SIZE
+    await refresh_rule_sets(db)
+    query = dict(match or {})
+    if village_ids is not None:
+        query["_id"] = {"$in": _object_ids(village_ids)}
+
+    stats = {"checked": 0, "recomputed": 0, "skipped": 0, "no_amenities": 0}
+    batch = []
+    async for village in db.villages.find(query, VILLAGE_FIELDS):
+        batch.append(village)
+        if len(batch) >= batch_size:
+            await _recompute_batch(db, batch, force, stats)
+            stats["checked"] += len(batch)
+            batch = []
+    if batch:
+        await _recompute_batch(db, batch, force, stats)
+        stats["checked"] += len(batch)
+
+    metrics.increment("gap_villages_checked", stats["checked"])
+    metrics.increment("gap_villages_recomputed", stats["recomputed"])
+    metrics.increment("gap_villages_skipped", stats["skipped"])
+    return stats
+
+async def recompute_districts(db, districts) -> dict:
+    """Recompute every village in the given (state, district) pairs"""
+    districts = list(districts)
+    if not districts:
+        return {"checked": 0, "recomputed": 0, "skipped": 0, "no_amenities": 0}
+    match = {"$or": [{"state": state, "district": district} for state, district in districts]}
+    return await recompute_gaps(db, match=match)
+
+async def watch_gap_inputs(db):
+    """Recompute gaps from change-stream events on villages and amenities"""
+    pending = set()
+    changed = asyncio.Event()
+
+    async def collect(collection, village_id_of):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        async with collection.watch(pipeline, full_document="updateLookup") as stream:
+            async for change in stream:
+                village_id = village_id_of(change)
+                if village_id:
+                    pending.add(str(village_id))
+                    changed.set()
+
+    async def flush():
+        while True:
+            await changed.wait()
+            await asyncio.sleep(GAP_CHANGE_DEBOUNCE_SECONDS)
+            changed.clear()
+            village_ids = list(pending)
+            pending.clear()
+            try:
+                await recompute_gaps(db, village_ids)
+            except Exception as e:
+                print(f"❌ Gap recompute from change stream failed: {e}")
+
+    await asyncio.gather(
+        collect(db.villages, lambda change: change["documentKey"]["_id"]),
+        collect(db.amenities, lambda change: (change.get("fullDocument") or {}).get("village_id")),
+        flush(),
+    )
+
+async def run_in_background(coro_fn, *args, **kwargs):
+    """BackgroundTasks entry point: never let a recompute failure surface to a request"""
+    try:
+        await coro_fn(*args, **kwargs)
+    except Exception as e:
+        print(f"❌ Gap recompute failed: {e}")
@@ -0,0 +1,368 @@
+"""
+Declarative gap-scoring rule sets
+A rule set is a plain document, stored in the `gap_rule_sets` collection with
+`_id` = "default" or a state name and an integer `version`, e.g.
+
+    {"_id": "Sikkim", "version": 3, "default_population": 1000,
+     "village_rules": [{"key": "electricity", "kind": "coverage", "field": "electricity",
+                        "threshold": 80, "weight": 20,
+                        "status": [{"gt": 50, "value": "moderate"}, {"value": "critical"}],
+                        "priority": [{"lt": 50, "value": "high"}, {"value": "medium"}],
+                        "message": "Only {value}% electricity coverage"}, ...],
+     "district_rules": [...]}
+
+Village rule kinds:
+- binary: gap when the value equals `equals` (default 0); adds the full weight
+- coverage: gap when value < threshold; adds weight * (threshold - value) / threshold
+- per_capita: `minimum` per `per` people required; adds weight * min(1, deficit / required)
+status/priority are ordered levels matched against the rule's value (gt/gte/lt/lte/eq);
+the first matching level wins and a level without conditions always matches.
+
+Documents are compiled once into CompiledRuleSet objects and cached by name and
+version; refresh_rule_sets() re-reads only the versions (at most every
+GAP_RULES_REFRESH_SECONDS) and recompiles the sets that changed. Without any
+stored documents the built-in DEFAULT_RULE_SET is used. A state-specific set
+overrides "default" for villages and districts of that state.
+"""
+
+import operator
+import os
+import time
+import uuid
+from string import Formatter
+import numpy as np
+
+GAP_RULES_REFRESH_SECONDS = float(os.getenv("GAP_RULES_REFRESH_SECONDS", "30"))
+
+DEFAULT_RULE_SET = {
+    "_id": "default",
+    "version": 0,
+    "default_population": 1000,
+    "village_rules": [
+        {"key": "water", "kind": "binary", "field": "water", "equals": 0, "weight": 25,
+         "status": [{"value": "critical"}], "priority": [{"value": "high"}],
+         "message": "No water access available"},
+        {"key": "electricity", "kind": "coverage", "field": "electricity", "threshold": 80, "weight": 20,
+         "status": [{"gt": 50, "value": "moderate"}, {"value": "critical"}],
+         "priority": [{"lt": 50, "value": "high"}, {"value": "medium"}],
+         "message": "Only {value}% electricity coverage"},
+        {"key": "education", "kind": "per_capita", "field": "schools", "per": 1000, "minimum": 1, "weight": 15,
+         "status": [{"eq": 0, "value": "critical"}, {"value": "moderate"}], "priority": [{"value": "high"}],
+         "message": "Need {deficit} more schools"},
+        {"key": "healthcare", "kind": "per_capita", "field": "health_centers", "per": 5000, "minimum": 1, "weight": 20,
+         "status": [{"eq": 0, "value": "critical"}, {"value": "moderate"}], "priority": [{"value": "high"}],
+         "message": "Need {deficit} more health centers"},
+        {"key": "sanitation", "kind": "coverage", "field": "toilets", "threshold": 70, "weight": 15,
+         "status": [{"gt": 40, "value": "moderate"}, {"value": "critical"}], "priority": [{"value": "medium"}],
+         "message": "Only {value}% toilet coverage"},
+        {"key": "connectivity", "kind": "coverage", "field": "internet", "threshold": 50, "weight": 5,
+         "status": [{"value": "moderate"}], "priority": [{"value": "low"}],
+         "message": "Only {value}% internet coverage"},
+    ],
+    # District-level rules over the unified dashboard's district summaries
+    "district_rules": [
+        {"key": "literacy", "gap_type": "education", "field": "literacy_rate", "when": {"lt": 70},
+         "severity": [{"lt": 60, "value": "high"}, {"value": "medium"}],
+         "score": {"kind": "deficit", "from": 100},
+         "description": "Low literacy rate ({value}%) requires educational infrastructure",
+         "affected": {"kind": "deficit_share"}, "cost_per_village": 2000000, "rank": 1},
+        {"key": "employment", "gap_type": "healthcare", "field": "work_participation_rate", "when": {"lt": 50},
+         "severity": [{"value": "high"}],
+         "score": {"kind": "deficit", "from": 50},
+         "description": "Low employment rate ({value}%) needs skill development",
+         "affected": {"kind": "share", "share": 0.3}, "cost_per_village": 1500000, "rank": 2},
+        {"key": "roads", "gap_type": "roads", "field": "total_villages", "when": {"gt": 12},
+         "severity": [{"value": "medium"}],
+         "score": {"kind": "scaled", "factor": 2, "max": 100},
+         "description": "Rural connectivity issues in {value} villages",
+         "affected": {"kind": "share", "share": 0.4}, "cost_per_village": 3000000, "rank": 3},
+        {"key": "water", "gap_type": "water",
+         "severity": [{"value": "medium"}],
+         "score": {"kind": "constant", "value": 45.0},
+         "description": "Water supply infrastructure needs in {district}",
+         "affected": {"kind": "share", "share": 0.25}, "cost_per_village": 1000000, "rank": 4},
+    ],
+}
+
+OPERATORS = {"gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le, "eq": operator.eq}
+
+def _compile_condition(spec: dict) -> tuple:
+    return tuple((OPERATORS[op], operand) for op, operand in spec.items() if op in OPERATORS)
+
+def _matches(checks: tuple, value) -> bool:
+    for check, operand in checks:
+        if not check(value, operand):
+            return False
+    return True
+
+class Levels:
+    """Ordered (conditions, value) levels; the first level whose conditions all hold wins"""
+
+    def __init__(self, levels: list):
+        self.levels = [(_compile_condition(level), level["value"]) for level in levels]
+        # Unconditional first level (the common case): no evaluation at all
+        self.constant = self.levels[0][1] if self.levels and not self.levels[0][0] else None
+
+    def pick(self, value):
+        if self.constant is not None:
+            return self.constant
+        for checks, result in self.levels:
+            if _matches(checks, value):
+                return result
+        return None
+
+    def select(self, values) -> list:
+        """pick() over a float64 array"""
+        if self.constant is not None:
+            return [self.constant] * len(values)
+        chosen = np.full(len(values), None, dtype=object)
+        undecided = np.ones(len(values), dtype=bool)
+        for checks, result in self.levels:
+            hit = undecided.copy()
+            for check, operand in checks:
+                hit &= check(values, operand)
+            chosen[hit] = result
+            undecided &= ~hit
+        return chosen.tolist()
+
+class VillageRule:
+    def __init__(self, spec: dict):
+        self.key = spec["key"]
+        self.kind = spec["kind"]
+        self.field = spec["field"]
+        self.weight = spec["weight"]
+        self.threshold = spec.get("threshold")
+        self.equals = spec.get("equals", 0)
+        self.per = spec.get("per")
+        self.minimum = spec.get("minimum", 1)
+        self.message = spec["message"]
+        # Placeholders the message uses: only those make two villages' messages differ
+        self.message_fields = {name.split(".")[0].split("[")[0]
+                               for _, name, _, _ in Formatter().parse(self.message) if name}
+        self.status = Levels(spec["status"])
+        self.priority = Levels(spec["priority"])
+        if self.kind not in ("binary", "coverage", "per_capita"):
+            raise ValueError(f"Unknown gap rule kind: {self.kind}")
+        if self.kind == "coverage" and not self.threshold:
+            raise ValueError(f"Coverage rule {self.key} needs a threshold")
+        if self.kind == "per_capita" and not self.per:
+            raise ValueError(f"Per-capita rule {self.key} needs `per`")
+
+    def required(self, population):
+        return max(self.minimum, population // self.per)
+
+    def evaluate(self, value, population):
+        """(gap entry, severity term) for one village, or (None, None) without a gap"""
+        if self.kind == "binary":
+            if value != self.equals:
+                return None, None
+            return self.entry(value, population), self.weight
+        if self.kind == "coverage":
+            if not value < self.threshold:
+                return None, None
+            return self.entry(value, population), self.weight * ((self.threshold - value) / self.threshold)
+        required = self.required(population)
+        if not value < required:
+            return None, None
+        return self.entry(value, population), self.weight * min(1.0, (required - value) / required)
+
+    def mask_and_term(self, values, population):
+        """Vectorized evaluate() over float64 arrays; same operations in the same order"""
+        if self.kind == "binary":
+            mask = values == self.equals
+            return mask, np.where(mask, float(self.weight), 0.0)
+        if self.kind == "coverage":
+            mask = values < self.threshold
+            return mask, np.where(mask, self.weight * ((self.threshold - values) / self.threshold), 0.0)
+        required = np.maximum(self.minimum, np.floor_divide(population, self.per))
+        mask = values < required
+        return mask, np.where(mask, self.weight * np.minimum(1.0, (required - values) / required), 0.0)
+
+    def _message(self, value, population) -> str:
+        # Raw Python values in the message so "Need 2 more" vs "Need 2.0 more" stays stable
+        deficit = self.required(population) - value if self.kind == "per_capita" else None
+        return self.message.format(value=value, deficit=deficit, threshold=self.threshold)
+
+    def entry(self, value, population) -> dict:
+        return {
+            "status": self.status.pick(value),
+            "message": self._message(value, population),
+            "priority": self.priority.pick(value)
+        }
+
+    def _deficits(self, flagged: list, raw_values: list, raw_population: list, flagged_values, flagged_population):
+        """Per-capita deficits computed over float64 arrays, as ints where Python arithmetic would give ints"""
+        if not (isinstance(self.minimum, int) and isinstance(self.per, int)):
+            return [self.required(raw_population[i]) - raw_values[i] for i in flagged]
+        quotient = np.floor_divide(flagged_population, self.per)
+        required = np.maximum(self.minimum, quotient)
+        # max() keeps the int minimum unless a (possibly float) quotient exceeds it
+        minimum_wins = (quotient <= self.minimum).tolist()
+        return [
+            int(deficit)
+            if isinstance(raw_values[i], int) and (wins or isinstance(raw_population[i], int)) else deficit
+            for i, deficit, wins in zip(flagged, (required - flagged_values).tolist(), minimum_wins)
+        ]
+
+    def messages(self, flagged: list, raw_values: list, raw_population: list, flagged_values, flagged_population) -> list:
+        """_message() for the flagged indices, formatting each distinct (value, deficit) only once"""
+        count = len(flagged)
+        values = [raw_values[i] for i in flagged] if "value" in self.message_fields else [None] * count
+        deficits = [None] * count
+        if self.kind == "per_capita" and "deficit" in self.message_fields:
+            deficits = self._deficits(flagged, raw_values, raw_population, flagged_values, flagged_population)
+
+        formatted, messages = {}, []
+        for value, deficit in zip(values, deficits):
+            # Types are part of the key: 60 and 60.0 are equal but format differently
+            key = (value.__class__, value, deficit.__class__, deficit)
+            message = formatted.get(key)
+            if message is None:
+                message = formatted[key] = self.message.format(value=value, deficit=deficit, threshold=self.threshold)
+            messages.append(message)
+        return messages
+
+    def entries(self, flagged: list, raw_values: list, raw_population: list, flagged_values, flagged_population) -> list:
+        """entry() for the flagged indices; status, priority and messages are derived column-wise"""
+        statuses = self.status.select(flagged_values)
+        priorities = self.priority.select(flagged_values)
+        messages = self.messages(flagged, raw_values, raw_population, flagged_values, flagged_population)
+        return [
+            {"status": status, "message": message, "priority": priority}
+            for status, message, priority in zip(statuses, messages, priorities)
+        ]
+
+class DistrictRule:
+    def __init__(self, spec: dict):
+        self.key = spec["key"]
+        self.gap_type = spec.get("gap_type", self.key)
+        self.field = spec.get("field")
+        self.rank = spec.get("rank")
+        self.description = spec["description"]
+        self.cost_per_village = spec.get("cost_per_village", 0)
+        self.when = _compile_condition(spec.get("when") or {})
+        self.severity = Levels(spec["severity"])
+        self.score = spec["score"]
+        self.affected = spec.get("affected", {"kind": "share", "share": 0})
+        if self.score["kind"] not in ("deficit", "scaled", "constant"):
+            raise ValueError(f"Unknown district score kind: {self.score['kind']}")
+
+    def _severity_score(self, value):
+        kind = self.score["kind"]
+        if kind == "deficit":
+            return round(self.score["from"] - value, 1)
+        if kind == "scaled":
+            return min(value * self.score["factor"], self.score["max"])
+        return self.score["value"]
+
+    def _affected_population(self, population, value):
+        if self.affected["kind"] == "deficit_share":
+            return int(population * (1 - value / 100))
+        return int(population * self.affected["share"])
+
+    def evaluate(self, district_name: str, district_data: dict):
+        value = district_data.get(self.field) if self.field else None
+        if not _matches(self.when, value):
+            return None
+        return {
+            'id': str(uuid.uuid4()),
+            'district': district_name,
+            'gap_type': self.gap_type,
+            'severity': self.severity.pick(value),
+            'severity_score': self._severity_score(value),
+            'description': self.description.format(value=value, district=district_name),
+            'affected_population': self._affected_population(district_data['total_population'], value),
+            'estimated_cost_to_fix': district_data['total_villages'] * self.cost_per_village,
+            'priority_rank': self.rank
+        }
+
+class CompiledRuleSet:
+    def __init__(self, document: dict):
+        self.name = document["_id"]
+        self.version = document.get("version", 0)
+        self.default_population = document.get("default_population", 1000)
+        self.village_rules = [VillageRule(spec) for spec in document.get("village_rules", [])]
+        self.district_rules = [DistrictRule(spec) for spec in document.get("district_rules", [])]
+        self.fields = tuple(rule.field for rule in self.village_rules)
+
+    @property
+    def tag(self) -> str:
+        """Identifies the rules a stored gaps document was scored with"""
+        return f"{self.name}:{self.version}"
+
+    def village_gaps(self, village: dict, amenities: dict):
+        """(gaps dict, severity_score) for one village"""
+        population = village.get("population", self.default_population)
+        gaps, severity_score = {}, 0.0
+        for rule in self.village_rules:
+            entry, term = rule.evaluate(amenities.get(rule.field, 0), population)
+            if entry is not None:
+                gaps[rule.key] = entry
+                severity_score += term
+        return gaps, severity_score
+
+    def district_gaps(self, district_name: str, district_data: dict) -> list:
+        gaps = []
+        for rule in self.district_rules:
+            gap = rule.evaluate(district_name, district_data)
+            if gap is not None:
+                gaps.append(gap)
+        return gaps
+
+_builtin = CompiledRuleSet(DEFAULT_RULE_SET)
+_rule_sets = {}
+_last_refresh = None
+
+def rule_set_for(state: str = None) -> CompiledRuleSet:
+    """The compiled rules for a state: its own set, else the stored default, else the built-in one"""
+    return _rule_sets.get(state) or _rule_sets.get("default") or _builtin
+
+def _stale(versions: dict) -> list:
+    return [name for name, version in versions.items()
+            if name not in _rule_sets or _rule_sets[name].version != version]
+
+def _apply(versions: dict, documents: list):
+    """Drop deleted sets and compile the changed documents"""
+    for name in list(_rule_sets):
+        if name not in versions:
+            del _rule_sets[name]
+    for document in documents:
+        try:
+            _rule_sets[document["_id"]] = CompiledRuleSet(document)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"⚠️ Invalid gap rule set {document.get('_id')}: {e}")
+
+def _due(force: bool) -> bool:
+    global _last_refresh
+    now = time.monotonic()
+    if not force and _last_refresh is not None and now - _last_refresh < GAP_RULES_REFRESH_SECONDS:
+        return False
+    _last_refresh = now
+    return True
+
+async def refresh_rule_sets(db, force: bool = False):
+    """Pick up new versions from `gap_rule_sets` (Motor); the cached sets stay in use on errors"""
+    if not _due(force):
+        return
+    try:
+        versions = {doc["_id"]: doc.get("version", 0)
+                    async for doc in db.gap_rule_sets.find({}, {"version": 1})}
+        stale = _stale(versions)
+        documents = [doc async for doc in db.gap_rule_sets.find({"_id": {"$in": stale}})] if stale else []
+    except Exception as e:
+        print(f"⚠️ Could not refresh gap rule sets: {e}")
+        return
+    _apply(versions, documents)
+
+def refresh_rule_sets_sync(db, force: bool = False):
+    """Pick up new versions from `gap_rule_sets` (PyMongo); the cached sets stay in use on errors"""
+    if not _due(force):
+        return
+    try:
+        versions = {doc["_id"]: doc.get("version", 0) for doc in db.gap_rule_sets.find({}, {"version": 1})}
+        stale = _stale(versions)
+        documents = list(db.gap_rule_sets.find({"_id": {"$in": stale}})) if stale else []
+    except Exception as e:
+        print(f"⚠️ Could not refresh gap rule sets: {e}")
+        return
+    _apply(versions, documents)
@@ -0,0 +1,89 @@
+"""
+Report image processing stage (runs before image_storage saves anything)
+- Applies the EXIF orientation, then downsizes to IMAGE_MAX_DIMENSION
+- Drops all EXIF metadata except the GPS block
+- Re-encodes to IMAGE_FORMAT (WebP by default) and renders a thumbnail
+Work is CPU bound, so it runs in a process pool rather than on request threads
+"""
+
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, ExifTags
+
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))
+THUMBNAIL_DIMENSION = int(os.getenv("THUMBNAIL_DIMENSION", "320"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+
+EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png"}
+CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+_pool = None
+
+def _gps_only_exif(image) -> bytes:
+    exif = image.getexif()
+    gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+    if not gps:
+        return b""
+
+    kept = Image.Exif()
+    kept[ExifTags.IFD.GPSInfo] = gps
+    return kept.tobytes()
+
+def _encode(image, exif: bytes = b"") -> bytes:
+    if IMAGE_FORMAT == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    options = {"optimize": True} if IMAGE_FORMAT == "PNG" else {"quality": IMAGE_QUALITY}
+    if exif:
+        options["exif"] = exif
+    image.save(buffer, IMAGE_FORMAT, **options)
+    return buffer.getvalue()
+
+def process_image(data: bytes) -> dict:
+    """Downscale, strip metadata (except GPS) and re-encode one image plus its thumbnail"""
+    with Image.open(io.BytesIO(data)) as original:
+        exif = _gps_only_exif(original)
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+        # thumbnail() keeps the aspect ratio and never upscales
+        image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+        processed = _encode(image, exif)
+
+        thumbnail = image.copy()
+        thumbnail.thumbnail((THUMBNAIL_DIMENSION, THUMBNAIL_DIMENSION), Image.LANCZOS)
+        thumbnail_bytes = _encode(thumbnail)
+
+    return {
+        "image": processed,
+        "thumbnail": thumbnail_bytes,
+        "extension": EXTENSIONS.get(IMAGE_FORMAT, ".img"),
+        "content_type": CONTENT_TYPES.get(IMAGE_FORMAT, "application/octet-stream"),
+        "width": image.width,
+        "height": image.height,
+        "original_bytes": len(data),
+        "stored_bytes": len(processed) + len(thumbnail_bytes),
+    }
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS)
+    return _pool
+
+async def process_image_async(data: bytes) -> dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), process_image, data)
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -0,0 +1,200 @@
+"""
+Pluggable storage for report images
+- IMAGE_STORAGE=cloudinary (default) uploads to Cloudinary
+- IMAGE_STORAGE=local writes under IMAGE_STORAGE_DIR and serves the files from
+  IMAGE_BASE_URL; a stand-in for tests and throughput benchmarks
+Backends expose a blocking save(); store_report_image runs it on a bounded
+thread pool after the report has been persisted with image_status "pending".
+With IMAGE_PROCESSING on (default) images go through image_processing first,
+so only the downscaled image and its thumbnail are stored
+
+The uploaded bytes are staged in GridFS (pending_report_images) before the
+report is inserted, and the report records the staged file. A worker claims a
+report by moving it from pending to processing. On startup, pending reports and
+processing claims older than IMAGE_CLAIM_STALE_SECONDS are picked up again, so
+a restart between the response and the upload loses nothing
+"""
+
+import asyncio
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+import metrics
+
+IMAGE_STORAGE = os.getenv("IMAGE_STORAGE", "cloudinary")
+IMAGE_STORAGE_DIR = os.getenv("IMAGE_STORAGE_DIR", "uploads/reports")
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/media/reports")
+IMAGE_PROCESSING = os.getenv("IMAGE_PROCESSING", "1").lower() not in ("0", "false", "no")
+# Processing claims without a result for this long are treated as orphaned
+IMAGE_CLAIM_STALE_SECONDS = int(os.getenv("IMAGE_CLAIM_STALE_SECONDS", "300"))
+
+PENDING_IMAGE_BUCKET = "pending_report_images"
+
+# Bounded pool for blocking uploads so they never run on the event loop
+IMAGE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMAGE_UPLOAD_WORKERS", "4")),
+    thread_name_prefix="image-upload"
+)
+
+class CloudinaryImageStorage:
+    def save(self, data: bytes, filename: str = None, content_type: str = None) -> str:
+        import cloudinary.uploader
+        import utils  # noqa: F401 - configures cloudinary from the environment
+
+        result = cloudinary.uploader.upload(data, folder="ruraliq_reports", resource_type="image")
+        return result["secure_url"]
+
+class LocalImageStorage:
+    def __init__(self, root: str = IMAGE_STORAGE_DIR, base_url: str = IMAGE_BASE_URL):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, data: bytes, filename: str = None, content_type: str = None) -> str:
+        extension = os.path.splitext(filename or "")[1].lower() or ".jpg"
+        name = f"{uuid.uuid4().hex}{extension}"
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(data)
+        return f"{self.base_url}/{name}"
+
+STORAGE_BACKENDS = {
+    "cloudinary": CloudinaryImageStorage,
+    "local": LocalImageStorage,
+}
+
+_storage = None
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        if IMAGE_STORAGE not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown IMAGE_STORAGE backend: {IMAGE_STORAGE}")
+        _storage = STORAGE_BACKENDS[IMAGE_STORAGE]()
+    return _storage
+
+def set_storage(storage):
+    """Swap the storage backend (tests and benchmarks)"""
+    global _storage
+    _storage = storage
+
+def mount_local_media(app):
+    """Serve locally stored images when the local backend is active"""
+    if IMAGE_STORAGE == "local":
+        from fastapi.staticfiles import StaticFiles
+
+        os.makedirs(IMAGE_STORAGE_DIR, exist_ok=True)
+        app.mount(IMAGE_BASE_URL, StaticFiles(directory=IMAGE_STORAGE_DIR), name="report-images")
+
+async def save_image(data: bytes, filename: str = None, content_type: str = None) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(IMAGE_EXECUTOR, get_storage().save, data, filename, content_type)
+
+async def _process_and_save(data: bytes, filename: str = None, content_type: str = None) -> dict:
+    if not IMAGE_PROCESSING:
+        return {"image_url": await save_image(data, filename, content_type)}
+
+    from image_processing import process_image_async
+
+    processed = await process_image_async(data)
+    name = f"{os.path.splitext(filename or 'image')[0]}{processed['extension']}"
+    image_url, thumbnail_url = await asyncio.gather(
+        save_image(processed["image"], name, processed["content_type"]),
+        save_image(processed["thumbnail"], f"thumb_{name}", processed["content_type"])
+    )
+    metrics.increment("report_image_bytes_received", processed["original_bytes"])
+    metrics.increment("report_image_bytes_stored", processed["stored_bytes"])
+    return {
+        "image_url": image_url,
+        "thumbnail_url": thumbnail_url,
+        "image_width": processed["width"],
+        "image_height": processed["height"],
+        "image_bytes": processed["stored_bytes"],
+    }
+
+async def stage_image(db, data: bytes, filename: str = None, content_type: str = None) -> dict:
+    """Write an uploaded image to GridFS; the returned reference goes on the report as pending_image"""
+    bucket = AsyncIOMotorGridFSBucket(db, bucket_name=PENDING_IMAGE_BUCKET)
+    file_id = await bucket.upload_from_stream(filename or "image", data, metadata={"content_type": content_type})
+    return {"file_id": file_id, "filename": filename, "content_type": content_type}
+
+async def discard_staged_image(db, pending_image: dict):
+    try:
+        await AsyncIOMotorGridFSBucket(db, bucket_name=PENDING_IMAGE_BUCKET).delete(pending_image["file_id"])
+    except Exception as e:
+        print(f"⚠️ Could not delete staged image {pending_image['file_id']}: {e}")
+
+async def _claim(db, report_id):
+    """Atomically move a pending report to processing so only one worker stores its image"""
+    return await db.reports.find_one_and_update(
+        {"_id": report_id, "image_status": "pending"},
+        {"$set": {"image_status": "processing", "image_claimed_at": datetime.utcnow()}},
+        projection={"pending_image": 1}
+    )
+
+async def store_report_image(db, report_id):
+    """Background stage: process and upload the staged image, then flip the report to stored (or failed)"""
+    report = await _claim(db, report_id)
+    if report is None or not report.get("pending_image"):
+        return
+    pending_image = report["pending_image"]
+
+    try:
+        bucket = AsyncIOMotorGridFSBucket(db, bucket_name=PENDING_IMAGE_BUCKET)
+        stream = await bucket.open_download_stream(pending_image["file_id"])
+        data = await stream.read()
+        stored = await _process_and_save(data, pending_image.get("filename"), pending_image.get("content_type"))
+    except Exception as e:
+        print(f"Error storing image for report {report_id}: {e}")
+        metrics.increment("report_images_failed")
+        await db.reports.update_one(
+            {"_id": report_id},
+            {"$set": {"image_status": "failed", "image_error": str(e), "image_updated_at": datetime.utcnow()},
+             "$unset": {"pending_image": "", "image_claimed_at": ""}}
+        )
+        await discard_staged_image(db, pending_image)
+        return
+
+    metrics.increment("report_images_stored")
+    await db.reports.update_one(
+        {"_id": report_id},
+        {"$set": {"image_status": "stored", **stored, "image_updated_at": datetime.utcnow()},
+         "$unset": {"pending_image": "", "image_claimed_at": ""}}
+    )
+    await discard_staged_image(db, pending_image)
+
+async def resume_pending_images(db) -> int:
+    """Store every staged image left pending (or orphaned mid-processing) by an earlier process"""
+    stale_before = datetime.utcnow() - timedelta(seconds=IMAGE_CLAIM_STALE_SECONDS)
+    await db.reports.update_many(
+        {"image_status": "processing", "image_claimed_at": {"$lt": stale_before}},
+        {"$set": {"image_status": "pending"}}
+    )
+
+    resumed = 0
+    cursor = db.reports.find({"image_status": "pending", "pending_image": {"$exists": True}}, {"_id": 1})
+    async for report in cursor:
+        # One at a time: each image is held in memory while it is processed
+        await store_report_image(db, report["_id"])
+        resumed += 1
+    return resumed
+
+_resume_task = None
+
+async def _resume_in_background(db):
+    try:
+        resumed = await resume_pending_images(db)
+        if resumed:
+            print(f"🔁 Resumed {resumed} pending report images")
+    except Exception as e:
+        print(f"⚠️ Could not resume pending report images: {e}")
+
+def start_resuming(db):
+    global _resume_task
+    _resume_task = asyncio.create_task(_resume_in_background(db))
+
+def stop_resuming():
+    if _resume_task is not None:
+        _resume_task.cancel()
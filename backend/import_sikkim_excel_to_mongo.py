@@ -7,6 +7,7 @@ Import Sikkim district Excel files into MongoDB.
   PCA_SC1103_2011_MDDS_DDW.xlsx, PCA_SC1104_2011_MDDS_DDW.xlsx
 - Normalizes column names and adds district metadata
 - Writes to collection: sikkim_villages_raw
+- Refreshes district_rollups/state_rollups for each imported district
 
 Usage:
   1) Ensure MongoDB is reachable via MONGO_URI in .env or environment
@@ -146,6 +147,9 @@ def main():
 
     print(f"\nDone. Total inserted: {all_rows} into collection 'sikkim_villages_raw'.")
     print("You can query with fetch_sikkim_from_mongo.py for examples.")
+    # Dashboards read the 'sikkim' collection, not this one; its rollups are refreshed by
+    # upload_json.py / upload_json_clean.py or rebuilt with rollups.py --rebuild-rollups
+    print("Dashboards are not affected: they read the 'sikkim' collection (load it with upload_json.py).")
 
 
 if __name__ == "__main__":
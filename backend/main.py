@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Response, BackgroundTasks, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from typing import Optional, List
 from bson import ObjectId
 import os
+import asyncio
 from dotenv import load_dotenv
 import uvicorn
 
@@ -14,12 +15,23 @@ import uvicorn
 load_dotenv()
 
 from models import *
-from auth import get_current_user, create_access_token, verify_password, get_password_hash
-from database import get_database
-from gap_detection import calculate_village_gaps
-from utils import upload_image_to_cloudinary
+from auth import get_current_user, create_access_token, hash_password_async, verify_and_update_password, invalidate_user, principal_claims
+from database import get_database, ensure_indexes, close_mongo_connection
+import gap_engine
+import village_priority
+import priority_heap
+import project_workflow
+import image_storage
+import image_processing
+from pagination import decode_cursor, next_cursor
+from rollups import refresh_village_rollups_after_write, load_village_rollups
+from village_ingest import ingest_upload
+import upload_jobs
+from report_sync import insert_reports, sync_chunk, get_watermark, SYNC_MAX_CHUNK_SIZE
+import metrics
 
 app = FastAPI(title="RuralIQ API", description="Smart Village Gap Detection System", version="1.0.0")
+app.include_router(metrics.router)
 
 # CORS middleware
 app.add_middleware(
@@ -28,10 +40,78 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 security = HTTPBearer()
 
+# Default and largest page size for project listings
+PROJECT_PAGE_SIZE = int(os.getenv("PROJECT_PAGE_SIZE", "100"))
+PROJECT_PAGE_MAX = int(os.getenv("PROJECT_PAGE_MAX", "500"))
+
+# Change-stream task keeping gaps fresh (GAP_CHANGE_STREAM=true)
+gap_watcher = None
+
+# Locally stored report images (IMAGE_STORAGE=local) are served by the API itself
+image_storage.mount_local_media(app)
+
+@app.on_event("startup")
+async def startup():
+    global gap_watcher
+    try:
+        await ensure_indexes(await get_database())
+    except Exception as e:
+        # Start anyway; requests degrade until MongoDB is reachable
+        print(f"⚠️ Could not create indexes at startup: {e}")
+    await upload_jobs.start_workers(get_database)
+    priority_heap.start_seeding(await get_database())
+    image_storage.start_resuming(await get_database())
+    if gap_engine.GAP_CHANGE_STREAM:
+        gap_watcher = asyncio.create_task(gap_engine.watch_gap_inputs(await get_database()))
+
+@app.on_event("shutdown")
+async def shutdown():
+    if gap_watcher:
+        gap_watcher.cancel()
+    priority_heap.stop_seeding()
+    image_storage.stop_resuming()
+    await upload_jobs.stop_workers()
+    image_processing.shutdown_pool()
+    await close_mongo_connection()
+
+async def load_amenities_map(db, village_ids: List[str]) -> dict:
+    """Fetch amenities for many villages with a single $in query, keyed by village_id"""
+    if not village_ids:
+        return {}
+    
+    cursor = db.amenities.find({"village_id": {"$in": village_ids}})
+    return {amenities["village_id"]: amenities async for amenities in cursor}
+
+def apply_keyset(filter_dict: dict, after: Optional[str]) -> dict:
+    """Add the `_id > cursor` range condition for keyset pagination"""
+    if not after:
+        return filter_dict
+    
+    try:
+        key = decode_cursor(after)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {**filter_dict, "_id": {"$gt": key["_id"]}}
+
+def build_village_response(village: dict, amenities: Optional[dict]) -> VillageResponse:
+    return VillageResponse(
+        id=str(village["_id"]),
+        name=village["name"],
+        district=village["district"],
+        state=village["state"],
+        population=village["population"],
+        sc_ratio=village["sc_ratio"],
+        geo_lat=village.get("geo_lat"),
+        geo_long=village.get("geo_long"),
+        amenities=AmenitiesResponse(**amenities) if amenities else None
+    )
+
 @app.get("/")
 async def root():
     return {"message": "RuralIQ API is running", "version": "1.0.0"}
@@ -42,13 +122,20 @@ async def login(user_credentials: UserLogin):
     db = await get_database()
     user = await db.users.find_one({"email": user_credentials.email})
     
-    if not user or not verify_password(user_credentials.password, user["password_hash"]):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password(user_credentials.password, user["password_hash"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
-    access_token = create_access_token(data={"sub": user["email"], "role": user["role"]})
+    # Rehash transparently when BCRYPT_ROUNDS changed since the password was set
+    if new_hash:
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"password_hash": new_hash}})
+    
+    access_token = create_access_token(data=principal_claims(user))
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -73,7 +160,7 @@ async def signup(user_data: UserCreate):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     user_doc = {
         "name": user_data.name,
         "email": user_data.email,
@@ -84,6 +171,7 @@ async def signup(user_data: UserCreate):
     
     result = await db.users.insert_one(user_doc)
     user_doc["_id"] = result.inserted_id
+    invalidate_user(user_doc["email"])
     
     return UserResponse(
         id=str(user_doc["_id"]),
@@ -95,10 +183,12 @@ async def signup(user_data: UserCreate):
 # Village endpoints
 @app.get("/api/villages", response_model=List[VillageResponse])
 async def get_villages(
+    response: Response,
     state: Optional[str] = None,
     district: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     db = await get_database()
@@ -110,31 +200,28 @@ async def get_villages(
     if district:
         filter_dict["district"] = district
     
-    villages = await db.villages.find(filter_dict).skip(skip).limit(limit).to_list(length=limit)
+    # Keyset pagination when a cursor is given, legacy skip otherwise
+    query = db.villages.find(apply_keyset(filter_dict, after)).sort("_id", 1)
+    if not after:
+        query = query.skip(skip)
+    villages = await query.limit(limit).to_list(length=limit)
     
-    # Get amenities for each village
-    result = []
-    for village in villages:
-        amenities = await db.amenities.find_one({"village_id": str(village["_id"])})
-        
-        village_response = VillageResponse(
-            id=str(village["_id"]),
-            name=village["name"],
-            district=village["district"],
-            state=village["state"],
-            population=village["population"],
-            sc_ratio=village["sc_ratio"],
-            geo_lat=village.get("geo_lat"),
-            geo_long=village.get("geo_long"),
-            amenities=AmenitiesResponse(**amenities) if amenities else None
-        )
-        result.append(village_response)
+    cursor = next_cursor(villages, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
     
-    return result
+    # Get amenities for the whole page in one query
+    amenities_by_village = await load_amenities_map(db, [str(village["_id"]) for village in villages])
+    
+    return [
+        build_village_response(village, amenities_by_village.get(str(village["_id"])))
+        for village in villages
+    ]
 
 @app.post("/api/villages", response_model=VillageResponse)
 async def create_village(
     village_data: VillageCreate,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
     # Only admin and state users can create villages
@@ -152,6 +239,7 @@ async def create_village(
     
     result = await db.villages.insert_one(village_doc)
     village_doc["_id"] = result.inserted_id
+    background_tasks.add_task(gap_engine.run_in_background, gap_engine.recompute_gaps, db, [str(result.inserted_id)])
     
     return VillageResponse(
         id=str(village_doc["_id"]),
@@ -179,17 +267,7 @@ async def get_village(village_id: str, current_user: dict = Depends(get_current_
     # Get amenities
     amenities = await db.amenities.find_one({"village_id": village_id})
     
-    return VillageResponse(
-        id=str(village["_id"]),
-        name=village["name"],
-        district=village["district"],
-        state=village["state"],
-        population=village["population"],
-        sc_ratio=village["sc_ratio"],
-        geo_lat=village.get("geo_lat"),
-        geo_long=village.get("geo_long"),
-        amenities=AmenitiesResponse(**amenities) if amenities else None
-    )
+    return build_village_response(village, amenities)
 
 # Gap detection endpoint
 @app.get("/api/gaps")
@@ -201,15 +279,18 @@ async def get_gaps(
     
     if village_id:
         # Get gaps for specific village
-        gaps = await db.gaps.find_one({"village_id": village_id})
+        gaps = await db.gaps.find_one({"village_id": village_id}, {"_id": 0})
         if not gaps:
             # Calculate gaps if not found
-            village = await db.villages.find_one({"_id": ObjectId(village_id)})
-            amenities = await db.amenities.find_one({"village_id": village_id})
-            
-            if village and amenities:
-                gaps = await calculate_village_gaps(village, amenities, db)
+            await gap_engine.recompute_gaps(db, [village_id])
+            gaps = await db.gaps.find_one({"village_id": village_id}, {"_id": 0})
         
+        if not gaps:
+            # Unknown or malformed id, or a village without amenities data
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No gap data for this village"
+            )
         return gaps
     else:
         # Get all gaps
@@ -220,77 +301,105 @@ async def get_gaps(
 @app.get("/api/recommendations")
 async def get_recommendations(
     limit: int = 10,
+    state: Optional[str] = None,
+    district: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
+    # Per-district top-K answered from memory while the heap is seeded and fresh
+    if not state:
+        cached = priority_heap.top(district, limit)
+        if cached is not None:
+            return cached
+    
     db = await get_database()
     
-    # Get villages with highest severity scores
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "gaps",
-                "localField": "_id",
-                "foreignField": "village_id",
-                "as": "gaps"
-            }
-        },
-        {
-            "$unwind": {
-                "path": "$gaps",
-                "preserveNullAndEmptyArrays": True
-            }
-        },
-        {
-            "$sort": {"gaps.severity_score": -1}
-        },
-        {
-            "$limit": limit
-        }
+    # Villages with the highest severity scores, read in index order from the priority index
+    rows = await village_priority.top_villages(db, max(limit, priority_heap.PRIORITY_HEAP_SIZE), state=state, district=district)
+    if not state:
+        priority_heap.seed(district, rows)
+    return rows[:limit]
+
+# District rollups of uploaded village data
+@app.get("/api/rollups/districts")
+async def get_district_rollups(
+    state: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Village count, population and SC population per (state, district), from the maintained rollups"""
+    db = await get_database()
+    rollups = await load_village_rollups(db, state)
+    return [
+        {"state": rollup["state"], "district": rollup["district_name"], **rollup.get("totals", {}),
+         "updated_at": rollup.get("updated_at")}
+        for rollup in rollups
     ]
-    
-    recommendations = await db.villages.aggregate(pipeline).to_list(length=limit)
-    return recommendations
 
 # Projects endpoints
+def project_response(project: dict) -> dict:
+    """ProjectResponse fields of a (projected) project document, with the listing defaults"""
+    return {
+        "village_id": "",
+        "name": "",
+        "type": "",
+        "status": "pending_state",
+        "progress_pct": 0,
+        **{k: v for k, v in project.items() if k != "_id"},
+        "id": str(project["_id"])
+    }
+
 @app.get("/api/projects", response_model=List[ProjectResponse])
 async def get_projects(
+    response: Response,
     village_id: Optional[str] = None,
     status: Optional[str] = None,
+    district: Optional[str] = None,
+    limit: int = Query(PROJECT_PAGE_SIZE, ge=1, le=PROJECT_PAGE_MAX),
+    after: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     db = await get_database()
     
+    # Equality filters match the (village_id, status, _id) and (status, created_by_district, _id) indexes
     filter_dict = {}
     if village_id:
         filter_dict["village_id"] = village_id
     if status:
         filter_dict["status"] = status
+    if district:
+        filter_dict["created_by_district"] = district
     
-    projects = await db.projects.find(filter_dict).to_list(length=1000)
-    
-    result = []
-    for project in projects:
-        result.append(ProjectResponse(
-            id=str(project["_id"]),
-            village_id=project.get("village_id", ""),
-            name=project.get("name", ""),
-            type=project.get("type", ""),
-            description=project.get("description", ""),
-            estimated_cost=project.get("estimated_cost", 0),
-            estimated_duration_months=project.get("estimated_duration_months", 6),
-            priority=project.get("priority", "medium"),
-            progress_pct=project.get("progress_pct", 0),
-            status=project.get("status", "pending_state"),
-            created_by=project.get("created_by", ""),
-            created_by_district=project.get("created_by_district", ""),
-            created_at=project.get("created_at"),
-            approved_by=project.get("approved_by"),
-            approved_at=project.get("approved_at"),
-            approval_notes=project.get("approval_notes"),
-            approved_budget=project.get("approved_budget")
-        ))
+    cursor = db.projects.find(apply_keyset(filter_dict, after), PROJECT_PROJECTION).sort("_id", 1).limit(limit)
+    projects = await cursor.to_list(length=limit)
     
-    return result
+    next_page = next_cursor(projects, limit)
+    if next_page:
+        response.headers["X-Next-Cursor"] = next_page
+    
+    return [project_response(project) for project in projects]
+
+@app.get("/api/projects/summary")
+async def get_projects_summary(
+    district: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Project counts by status and by district, from one aggregation"""
+    db = await get_database()
+    
+    pipeline = [{"$match": {"created_by_district": district}}] if district else []
+    pipeline.append({
+        "$group": {"_id": {"status": "$status", "district": "$created_by_district"}, "count": {"$sum": 1}}
+    })
+    
+    summary = {"total": 0, "by_status": {}, "by_district": {}}
+    async for row in db.projects.aggregate(pipeline):
+        project_status = row["_id"].get("status") or "unknown"
+        district_counts = summary["by_district"].setdefault(row["_id"].get("district") or "unknown", {"total": 0})
+        summary["total"] += row["count"]
+        summary["by_status"][project_status] = summary["by_status"].get(project_status, 0) + row["count"]
+        district_counts["total"] += row["count"]
+        district_counts[project_status] = district_counts.get(project_status, 0) + row["count"]
+    
+    return summary
 
 @app.post("/api/projects", response_model=ProjectResponse)
 async def create_project(
@@ -321,6 +430,14 @@ async def create_project(
         **{k: v for k, v in project_doc.items() if k != "_id"}
     )
 
+# HTTP status for each kind of rejected workflow update
+TRANSITION_ERROR_STATUS = {
+    "invalid": status.HTTP_400_BAD_REQUEST,
+    "not_found": status.HTTP_404_NOT_FOUND,
+    "forbidden": status.HTTP_403_FORBIDDEN,
+    "conflict": status.HTTP_409_CONFLICT,
+}
+
 @app.put("/api/projects/{project_id}")
 async def update_project(
     project_id: str,
@@ -330,88 +447,40 @@ async def update_project(
     """Update project status and details - implements district → state → central approval workflow"""
     db = await get_database()
     
+    # One conditional find_one_and_update: the status change only applies if the
+    # project is still in a status the transition table allows this role to move from
     try:
-        project = await db.projects.find_one({"_id": ObjectId(project_id)})
-    except:
+        project = await project_workflow.apply_update(db, project_id, update_data, current_user)
+    except project_workflow.TransitionError as e:
+        raise HTTPException(status_code=TRANSITION_ERROR_STATUS[e.reason], detail=e.detail)
+    
+    return {"message": "Project updated successfully", "project": project}
+
+@app.post("/api/projects/bulk_transition")
+async def bulk_transition_projects(
+    transition: BulkTransition,
+    current_user: dict = Depends(get_current_user)
+):
+    """Move many projects to one status with concurrent conditional updates, with a per-project outcome"""
+    if len(transition.project_ids) > project_workflow.BULK_TRANSITION_MAX:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid project ID"
+            detail=f"Bulk transitions are limited to {project_workflow.BULK_TRANSITION_MAX} projects"
         )
     
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    update_fields = {}
-    
-    # Handle status updates for approval workflow
-    if "status" in update_data:
-        new_status = update_data["status"]
-        user_role = current_user.get("role")
-        
-        # State officer actions
-        if user_role == "state" and project["status"] == "pending_state":
-            if new_status == "pending_admin":
-                update_fields["status"] = "pending_admin"
-                update_fields["submitted_to_admin"] = datetime.utcnow()
-                update_fields["state_approved_by"] = current_user.get("name", user_role)
-            elif new_status == "rejected":
-                update_fields["status"] = "rejected"
-                update_fields["rejected_by"] = current_user.get("name", user_role)
-                update_fields["rejected_at"] = datetime.utcnow()
-                if "rejection_reason" in update_data:
-                    update_fields["rejection_reason"] = update_data["rejection_reason"]
-        
-        # Central/Admin officer actions  
-        elif user_role in ["admin", "central"] and project["status"] == "pending_admin":
-            if new_status == "approved":
-                update_fields["status"] = "approved"
-                update_fields["approved_by"] = current_user.get("name", user_role)
-                update_fields["approved_at"] = datetime.utcnow()
-                if "approved_budget" in update_data:
-                    update_fields["approved_budget"] = update_data["approved_budget"]
-            elif new_status == "rejected":
-                update_fields["status"] = "rejected"
-                update_fields["rejected_by"] = current_user.get("name", user_role)
-                update_fields["rejected_at"] = datetime.utcnow()
-                if "rejection_reason" in update_data:
-                    update_fields["rejection_reason"] = update_data["rejection_reason"]
-        
-        # Progress updates for approved projects
-        elif project["status"] == "approved":
-            if new_status == "in_progress":
-                update_fields["status"] = "in_progress"
-                update_fields["started_at"] = datetime.utcnow()
-            elif new_status == "completed":
-                update_fields["status"] = "completed"
-                update_fields["completed_at"] = datetime.utcnow()
-        
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to perform this action"
-            )
-    
-    # Handle other field updates
-    allowed_fields = ["progress_pct", "description", "notes", "estimated_cost", "priority"]
-    for field in allowed_fields:
-        if field in update_data:
-            update_fields[field] = update_data[field]
-    
-    # Update last modified
-    update_fields["updated_at"] = datetime.utcnow()
-    
-    # Perform the update
-    result = await db.projects.update_one(
-        {"_id": ObjectId(project_id)},
-        {"$set": update_fields}
-    )
+    db = await get_database()
     
-    if result.modified_count == 0:
-        raise HTTPException(status_code=400, detail="No changes made to project")
+    update_data = transition.model_dump(exclude={"project_ids"}, exclude_none=True)
+    try:
+        results = await project_workflow.bulk_transition(db, transition.project_ids, update_data, current_user)
+    except project_workflow.TransitionError as e:
+        raise HTTPException(status_code=TRANSITION_ERROR_STATUS[e.reason], detail=e.detail)
     
-    # Return updated project
-    updated_project = await db.projects.find_one({"_id": ObjectId(project_id)})
-    return {"message": "Project updated successfully", "project": updated_project}
+    return {
+        "status": transition.status,
+        "updated": sum(1 for result in results if result["outcome"] == "updated"),
+        "results": results
+    }
 
 # Reports endpoints
 @app.post("/api/reports")
@@ -420,70 +489,110 @@ async def create_report(
     description: str,
     gps_lat: float,
     gps_long: float,
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(None),
     current_user: dict = Depends(get_current_user)
 ):
+    """Persist the report immediately; an attached image is stored in the background"""
     db = await get_database()
     
-    # Upload image if provided
-    image_url = None
-    if image:
-        image_url = await upload_image_to_cloudinary(image)
+    # Stage the image durably now: the upload is closed once the response is sent,
+    # and a restart before the background stage runs must not lose it
+    image_data = await image.read() if image else None
+    pending_image = await image_storage.stage_image(db, image_data, image.filename, image.content_type) if image_data else None
     
     report_doc = {
         "user_id": current_user["id"],
         "village_id": village_id,
         "description": description,
         "gps": {"lat": gps_lat, "long": gps_long},
-        "image_url": image_url,
+        "image_url": None,
+        "image_status": "pending" if pending_image else "none",
         "timestamp": datetime.utcnow(),
         "synced": True
     }
+    if pending_image:
+        report_doc["pending_image"] = pending_image
+    
+    try:
+        result = await db.reports.insert_one(report_doc)
+    except Exception:
+        if pending_image:
+            await image_storage.discard_staged_image(db, pending_image)
+        raise
     
-    result = await db.reports.insert_one(report_doc)
+    if pending_image:
+        background_tasks.add_task(image_storage.store_report_image, db, result.inserted_id)
     
-    return {"id": str(result.inserted_id), "message": "Report created successfully"}
+    return {
+        "id": str(result.inserted_id),
+        "message": "Report created successfully",
+        "image_status": report_doc["image_status"]
+    }
+
+def schedule_report_gap_refresh(background_tasks: BackgroundTasks, db, reports: list):
+    """Re-check gaps of the villages field reports came in for (a no-op when their inputs are unchanged)"""
+    village_ids = {report.get("village_id") for report in reports if report.get("village_id")}
+    if village_ids:
+        background_tasks.add_task(gap_engine.run_in_background, gap_engine.recompute_gaps, db, list(village_ids))
 
 @app.post("/api/sync/reports")
 async def sync_reports(
     reports: List[dict],
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
-    """Accept batched offline reports"""
+    """Accept batched offline reports (one $in duplicate lookup + one unordered insert_many)"""
     db = await get_database()
     
-    processed = []
-    for report_data in reports:
-        try:
-            # Add metadata
-            report_data["user_id"] = current_user["id"]
-            report_data["synced"] = True
-            report_data["sync_timestamp"] = datetime.utcnow()
-            
-            # Check for duplicates using client_id if provided
-            if "client_id" in report_data:
-                existing = await db.reports.find_one({"client_id": report_data["client_id"]})
-                if existing:
-                    processed.append({"client_id": report_data["client_id"], "status": "duplicate"})
-                    continue
-            
-            result = await db.reports.insert_one(report_data)
-            processed.append({"client_id": report_data.get("client_id"), "id": str(result.inserted_id), "status": "success"})
-            
-        except Exception as e:
-            processed.append({"client_id": report_data.get("client_id"), "status": "error", "error": str(e)})
+    processed = await insert_reports(db, reports, current_user["id"])
+    schedule_report_gap_refresh(background_tasks, db, reports)
     
     return {"processed": processed}
 
+@app.get("/api/sync/reports/watermark")
+async def get_sync_watermark(
+    device_id: str,
+    store_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Last report seq the server acknowledged for a device; clients resume after it
+    A store_id the server has not seen for the device resets the watermark"""
+    db = await get_database()
+    acked_seq = await get_watermark(db, current_user["id"], device_id, store_id)
+    
+    return {"device_id": device_id, "since": acked_seq, "max_chunk_size": SYNC_MAX_CHUNK_SIZE}
+
+@app.post("/api/sync/reports/chunk")
+async def sync_report_chunk(
+    chunk: SyncChunk,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Accept one bounded chunk of sequenced offline reports and acknowledge the new watermark"""
+    if len(chunk.reports) > SYNC_MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Chunks are limited to {SYNC_MAX_CHUNK_SIZE} reports"
+        )
+    
+    db = await get_database()
+    result = await sync_chunk(db, current_user["id"], chunk.device_id, chunk.reports, chunk.store_id)
+    schedule_report_gap_refresh(background_tasks, db, chunk.reports)
+    return result
+
 # Village data upload endpoint
 @app.post("/api/upload_village_data")
 async def upload_village_data(
+    response: Response,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    job: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
-    """Upload village data via Excel/CSV file"""
+    """Upload village data via Excel/CSV file (parsed and written in streamed chunks)
+    With ?job=true the file is stored and imported by a background worker; poll /api/upload_jobs/{job_id}"""
     import pandas as pd
-    import io
     
     # Check if user has permission (village functionaries can upload for their village)
     if current_user.get("role") not in ["village", "admin", "district", "state"]:
@@ -499,75 +608,47 @@ async def upload_village_data(
             detail="Only Excel (.xlsx, .xls) and CSV files are supported"
         )
     
+    if job:
+        db = await get_database()
+        upload_job, duplicate = await upload_jobs.submit_upload_job(db, file, current_user)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {**upload_jobs.job_status(upload_job), "duplicate": duplicate}
+    
+    async def report_progress(summary):
+        metrics.increment("upload_chunks_processed")
+        print(f"📦 {file.filename}: chunk {summary['chunks']} done, {summary['total_rows']} rows "
+              f"({summary['created']} created, {summary['updated']} updated)")
+    
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Parse based on file type
-        if file.filename.lower().endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(content))
-        else:
-            df = pd.read_excel(io.BytesIO(content))
+        db = await get_database()
         
-        # Basic validation - check if required columns exist
-        required_columns = ['name', 'population']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Missing required columns: {', '.join(missing_columns)}"
+        # Stream from the spooled upload file instead of reading it into memory
+        try:
+            summary = await ingest_upload(
+                db, file.file, file.filename,
+                current_user.get('state'), current_user.get('district'),
+                progress=report_progress
             )
+        except pd.errors.EmptyDataError:
+            raise
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
-        db = await get_database()
-        updated_count = 0
-        created_count = 0
+        # Refresh district rollups for the districts this upload touched
+        await refresh_village_rollups_after_write(db, summary["districts"])
         
-        # Process each row
-        for _, row in df.iterrows():
-            village_data = {
-                "name": row.get('name'),
-                "population": int(row.get('population', 0)),
-                "state": row.get('state', current_user.get('state')),
-                "district": row.get('district', current_user.get('district')),
-                "sc_ratio": float(row.get('sc_ratio', 0)),
-                "amenities": {
-                    "water": int(row.get('water', 0)),
-                    "electricity": float(row.get('electricity', 0)),
-                    "schools": int(row.get('schools', 0)),
-                    "health_centers": int(row.get('health_centers', 0)),
-                    "toilets": float(row.get('toilets', 0)),
-                    "internet": float(row.get('internet', 0))
-                },
-                "updated_at": datetime.utcnow()
-            }
-            
-            # Check if village exists (by name and district)
-            existing_village = await db.villages.find_one({
-                "name": village_data["name"],
-                "district": village_data["district"],
-                "state": village_data["state"]
-            })
-            
-            if existing_village:
-                # Update existing village
-                await db.villages.update_one(
-                    {"_id": existing_village["_id"]},
-                    {"$set": village_data}
-                )
-                updated_count += 1
-            else:
-                # Create new village
-                village_data["created_at"] = datetime.utcnow()
-                await db.villages.insert_one(village_data)
-                created_count += 1
+        # Gaps of changed villages are recomputed after the response
+        background_tasks.add_task(gap_engine.run_in_background, gap_engine.recompute_districts, db, summary["districts"])
         
         return {
             "message": "Village data uploaded successfully",
-            "created": created_count,
-            "updated": updated_count,
-            "total_rows": len(df)
+            "created": summary["created"],
+            "updated": summary["updated"],
+            "total_rows": summary["total_rows"]
         }
         
+    except HTTPException:
+        raise
     except pd.errors.EmptyDataError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -579,5 +660,19 @@ async def upload_village_data(
             detail=f"Error processing file: {str(e)}"
         )
 
+@app.get("/api/upload_jobs/{job_id}")
+async def get_upload_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Progress of a background village data upload"""
+    db = await get_database()
+    upload_job = await db.upload_jobs.find_one({"_id": job_id})
+    
+    if not upload_job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    
+    if upload_job.get("created_by") != current_user["id"] and current_user.get("role") not in ["admin", "state"]:
+        raise HTTPException(status_code=403, detail="Access denied to this upload job")
+    
+    return upload_jobs.job_status(upload_job)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+In-process counters for connection, cache and throughput metrics
+Served as JSON by the /metrics route each app includes
+"""
+
+import threading
+from collections import defaultdict
+from fastapi import APIRouter
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+
+def increment(name: str, value: int = 1):
+    with _lock:
+        _counters[name] += value
+
+def get(name: str) -> int:
+    with _lock:
+        return _counters[name]
+
+def snapshot() -> dict:
+    with _lock:
+        return dict(_counters)
+
+router = APIRouter()
+
+@router.get("/metrics")
+def get_metrics():
+    """Current values of all in-process counters"""
+    return snapshot()
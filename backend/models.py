@@ -130,6 +130,15 @@ class ProjectResponse(BaseModel):
     approval_notes: Optional[str] = None
     approved_budget: Optional[float] = None
 
+class BulkTransition(BaseModel):
+    project_ids: List[str]
+    status: str
+    rejection_reason: Optional[str] = None
+    approved_budget: Optional[float] = None
+
+# Server-side projection for project listings: exactly the fields ProjectResponse renders
+PROJECT_PROJECTION = {field: 1 for field in ProjectResponse.model_fields if field != "id"}
+
 # Enhanced Gap models
 class GapSeverity(str, Enum):
     LOW = "low"
@@ -187,9 +196,17 @@ class ReportResponse(BaseModel):
     description: str
     gps: dict
     image_url: Optional[str] = None
+    image_status: Optional[str] = None
+    thumbnail_url: Optional[str] = None
     timestamp: datetime
     synced: bool = True
 
+class SyncChunk(BaseModel):
+    device_id: str
+    # Identifies the client's local store; a new one resets the device watermark
+    store_id: Optional[str] = None
+    reports: List[dict]
+
 # Dashboard models
 class DashboardStats(BaseModel):
     total_districts: int
@@ -0,0 +1,104 @@
+"""
+Process-wide pooled MongoClient shared by the sync FastAPI apps
+- One client per process, created lazily and reused by every request
+- Pool size and timeouts come from the environment
+- Connections opened/closed are counted in metrics
+"""
+
+import os
+import threading
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from pymongo import MongoClient, monitoring
+import metrics
+
+load_dotenv()
+
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "sih2")
+
+def _env_int(name: str, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+POOL_OPTIONS = {
+    "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", 50),
+    "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS", 300000),
+    "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+    "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS", 10000),
+    "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS", None),
+}
+
+class ConnectionCounter(monitoring.ConnectionPoolListener):
+    """Counts pooled connections so per-request reconnects show up in metrics"""
+
+    def connection_created(self, event):
+        metrics.increment("mongo_connections_opened")
+
+    def connection_closed(self, event):
+        metrics.increment("mongo_connections_closed")
+
+    def pool_created(self, event):
+        metrics.increment("mongo_pools_created")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        metrics.increment("mongo_checkout_failures")
+
+    def connection_checked_out(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> MongoClient:
+    """Return the shared client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(
+                    os.getenv("MONGO_URI"),
+                    event_listeners=[ConnectionCounter()],
+                    **POOL_OPTIONS
+                )
+                metrics.increment("mongo_clients_created")
+    return _client
+
+def get_database(db_name: str = None):
+    return get_client()[db_name or MONGO_DB_NAME]
+
+def get_collection(collection_name: str, db_name: str = None):
+    return get_database(db_name)[collection_name]
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+@asynccontextmanager
+async def lifespan(app):
+    """FastAPI lifespan that closes the shared pool on shutdown"""
+    try:
+        yield
+    finally:
+        close_client()
@@ -0,0 +1,30 @@
+"""
+Keyset (cursor) pagination helpers
+Cursors are opaque URL-safe strings wrapping the sort key of the last document on a page
+"""
+
+import base64
+from bson import json_util
+
+def encode_cursor(**key) -> str:
+    """Encode the sort key of the last returned document as an opaque cursor"""
+    raw = json_util.dumps(key).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json_util.loads(raw)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+    if not isinstance(key, dict) or "_id" not in key:
+        raise ValueError("Invalid pagination cursor")
+    return key
+
+def next_cursor(page: list, limit: int, **extra_key):
+    """Cursor for the page after `page`, or None when this was the last page"""
+    if limit <= 0 or len(page) < limit:
+        return None
+    return encode_cursor(_id=page[-1]["_id"], **extra_key)
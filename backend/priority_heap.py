@@ -0,0 +1,150 @@
+"""
+In-process top-K cache for /api/recommendations
+- One bounded top-K (PRIORITY_HEAP_SIZE entries) of village_priority entries per
+  district, plus one across all districts (key None)
+- Seeded from the village_priority index at startup (in the background) and
+  on every database fallback, then kept current from the gap engine's writes
+- top() only answers when it can prove the answer: the heap is seeded, within
+  PRIORITY_HEAP_TTL_SECONDS of its last seed, and no update has pushed an
+  unknown village into its range. Otherwise the caller reads the index and
+  reseeds. The TTL also bounds drift from writes made by other processes
+- PRIORITY_HEAP_SIZE=0 disables the cache
+"""
+
+import asyncio
+import os
+import time
+
+import metrics
+
+PRIORITY_HEAP_SIZE = int(os.getenv("PRIORITY_HEAP_SIZE", "50"))
+PRIORITY_HEAP_TTL_SECONDS = float(os.getenv("PRIORITY_HEAP_TTL_SECONDS", "300"))
+
+def _rank(entry: dict):
+    # Same order as the index read: severity_score desc, then village_id asc
+    return (-entry["severity_score"], entry["village_id"])
+
+class TopK:
+    def __init__(self, capacity: int, rows: list):
+        self.capacity = capacity
+        self.entries = {row["village_id"]: row for row in rows[:capacity]}
+        # Truncated: the district has villages beyond the ones held here
+        self.truncated = len(rows) >= capacity
+        self.complete = True
+        self.seeded_at = time.monotonic()
+        self._ordered = None
+
+    def fresh(self) -> bool:
+        return self.complete and time.monotonic() - self.seeded_at < PRIORITY_HEAP_TTL_SECONDS
+
+    def _worst(self):
+        return max(self.entries.values(), key=_rank)
+
+    def update(self, entry: dict):
+        village_id = entry["village_id"]
+        self._ordered = None
+        current = self.entries.get(village_id)
+        if current is not None:
+            self.entries[village_id] = entry
+            # A village that dropped to the bottom may now rank below one we never loaded
+            if self.truncated and _rank(entry) > _rank(current) and self._worst() is entry:
+                self.complete = False
+            return
+
+        if self.truncated and self.entries and _rank(entry) >= _rank(self._worst()):
+            return
+        self.entries[village_id] = entry
+        if len(self.entries) > self.capacity:
+            del self.entries[self._worst()["village_id"]]
+            self.truncated = True
+
+    def remove(self, village_id: str):
+        if self.entries.pop(village_id, None) is not None:
+            self._ordered = None
+            if self.truncated:
+                self.complete = False
+
+    def top(self, limit: int):
+        if limit > len(self.entries) and self.truncated:
+            return None
+        if self._ordered is None:
+            self._ordered = sorted(self.entries.values(), key=_rank)
+        return self._ordered[:limit]
+
+_heaps = {}
+# district each cached village is held under, to move it when its district changes
+_district_of = {}
+_seed_task = None
+
+def enabled() -> bool:
+    return PRIORITY_HEAP_SIZE > 0
+
+def top(district: str = None, limit: int = 10):
+    """Cached top-`limit` for a district (None = all districts), or None when the database must answer"""
+    heap = _heaps.get(district) if enabled() else None
+    result = heap.top(limit) if heap is not None and heap.fresh() else None
+    metrics.increment("priority_heap_misses" if result is None else "priority_heap_hits")
+    return result
+
+def seed(district: str, rows: list):
+    """Replace a district's heap with the leading rows of an index read (severity order)"""
+    if not enabled():
+        return
+    heap = TopK(PRIORITY_HEAP_SIZE, rows)
+    if district is not None:
+        previous = _heaps.get(district)
+        for village_id in (previous.entries if previous else ()):
+            if _district_of.get(village_id) == district:
+                del _district_of[village_id]
+        for village_id in heap.entries:
+            _district_of[village_id] = district
+    _heaps[district] = heap
+
+def apply_updates(entries: list):
+    """Fold freshly written priority entries into the seeded heaps"""
+    if not enabled():
+        return
+    for entry in entries:
+        district = entry.get("district")
+        previous = _district_of.get(entry["village_id"])
+        if previous is not None and previous != district and previous in _heaps:
+            _heaps[previous].remove(entry["village_id"])
+            _district_of.pop(entry["village_id"], None)
+
+        for key in (None, district):
+            heap = _heaps.get(key)
+            if heap is not None:
+                heap.update(entry)
+                if key is not None and entry["village_id"] in heap.entries:
+                    _district_of[entry["village_id"]] = key
+
+def clear():
+    _heaps.clear()
+    _district_of.clear()
+
+async def seed_all(db):
+    """Seed the global heap and every district's heap from the village_priority index"""
+    from village_priority import top_villages, VILLAGE_PRIORITY
+
+    started = time.perf_counter()
+    seed(None, await top_villages(db, PRIORITY_HEAP_SIZE))
+    districts = await db[VILLAGE_PRIORITY].distinct("district")
+    for district in districts:
+        if district is not None:
+            seed(district, await top_villages(db, PRIORITY_HEAP_SIZE, district=district))
+    print(f"✅ Seeded recommendation heaps for {len(districts)} districts in {time.perf_counter() - started:.1f}s")
+
+async def _seed_in_background(db):
+    try:
+        await seed_all(db)
+    except Exception as e:
+        print(f"⚠️ Could not seed recommendation heaps (falling back to the database): {e}")
+
+def start_seeding(db):
+    global _seed_task
+    if enabled():
+        _seed_task = asyncio.create_task(_seed_in_background(db))
+
+def stop_seeding():
+    if _seed_task is not None:
+        _seed_task.cancel()
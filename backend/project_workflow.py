@@ -0,0 +1,194 @@
+"""
+Project approval workflow
+pending_state → pending_admin → approved → in_progress → completed, with
+rejection by the state officer (pending_state) or central/admin (pending_admin).
+Each transition is a row of TRANSITIONS: who may make it and what it stamps.
+A status change is applied with one find_one_and_update conditioned on the
+current status, so two officers acting on the same project cannot both win.
+"""
+
+import os
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+# (from, to) -> roles allowed (None = any), timestamp field, actor field, fields copied from the request
+TRANSITIONS = {
+    ("pending_state", "pending_admin"): {"roles": {"state"}, "stamp": "submitted_to_admin", "actor": "state_approved_by"},
+    ("pending_state", "rejected"): {"roles": {"state"}, "stamp": "rejected_at", "actor": "rejected_by", "copy": ("rejection_reason",)},
+    ("pending_admin", "approved"): {"roles": {"admin", "central"}, "stamp": "approved_at", "actor": "approved_by", "copy": ("approved_budget",)},
+    ("pending_admin", "rejected"): {"roles": {"admin", "central"}, "stamp": "rejected_at", "actor": "rejected_by", "copy": ("rejection_reason",)},
+    ("approved", "in_progress"): {"roles": None, "stamp": "started_at"},
+    ("approved", "completed"): {"roles": None, "stamp": "completed_at"},
+    ("in_progress", "completed"): {"roles": None, "stamp": "completed_at"},
+}
+
+# Statuses a project may be moved to; anything else is an invalid request, not a permission problem
+TARGET_STATUSES = {target for _, target in TRANSITIONS}
+
+BULK_TRANSITION_MAX = int(os.getenv("BULK_TRANSITION_MAX", "500"))
+
+# Non-status fields a project update may set
+UPDATABLE_FIELDS = ("progress_pct", "description", "notes", "estimated_cost", "priority")
+
+class TransitionError(Exception):
+    """A rejected update; reason is one of invalid, not_found, forbidden, conflict"""
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+
+def allowed_sources(role: str, target: str) -> list:
+    """Statuses from which `role` may move a project to `target`"""
+    return [
+        source for (source, to), rule in TRANSITIONS.items()
+        if to == target and (rule["roles"] is None or role in rule["roles"])
+    ]
+
+def transition_fields(source: str, target: str, user: dict, update_data: dict, now: datetime) -> dict:
+    """$set fields for the move from `source` to `target`"""
+    rule = TRANSITIONS[(source, target)]
+    fields = {"status": target, rule["stamp"]: now}
+    if rule.get("actor"):
+        fields[rule["actor"]] = user.get("name", user.get("role"))
+    for field in rule.get("copy", ()):
+        if field in update_data:
+            fields[field] = update_data[field]
+    return fields
+
+def _now() -> datetime:
+    # Millisecond precision, as stored by MongoDB
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def plan_update(user: dict, update_data: dict, now: datetime = None) -> list:
+    """
+    [(allowed current statuses or None, $set fields)] for an update request; raises TransitionError.
+    Source statuses whose transitions set the same fields share one entry, so with
+    today's table every request is a single entry (one conditional write)
+    """
+    now = now or _now()
+    fields = {field: update_data[field] for field in UPDATABLE_FIELDS if field in update_data}
+    fields["updated_at"] = now
+    if "status" not in update_data:
+        return [(None, fields)]
+
+    target = update_data["status"]
+    if not isinstance(target, str) or target not in TARGET_STATUSES:
+        raise TransitionError("invalid", f"Unknown project status: {target}")
+    sources = allowed_sources(user.get("role"), target)
+    if not sources:
+        raise TransitionError("forbidden", "You don't have permission to perform this action")
+
+    plans = []
+    for source in sources:
+        source_fields = {**fields, **transition_fields(source, target, user, update_data, now)}
+        plan = next((plan for plan in plans if plan[1] == source_fields), None)
+        if plan is None:
+            plans.append(([source], source_fields))
+        else:
+            plan[0].append(source)
+    return plans
+
+def project_object_id(project_id: str) -> ObjectId:
+    try:
+        return ObjectId(project_id)
+    except Exception:
+        raise TransitionError("invalid", "Invalid project ID")
+
+def serialize_project(project: dict) -> dict:
+    return {**project, "_id": str(project["_id"])}
+
+async def explain_miss(db, project_id: ObjectId, target: str = None) -> TransitionError:
+    """Why a conditional update matched nothing: missing project or a status that moved on"""
+    current = await db.projects.find_one({"_id": project_id}, {"status": 1})
+    if current is None:
+        return TransitionError("not_found", "Project not found")
+    return TransitionError(
+        "conflict", f"Project is {current.get('status')}; it cannot move to {target} from there"
+    )
+
+async def apply_update(db, project_id: str, update_data: dict, user: dict) -> dict:
+    """Apply a workflow update in one round trip and return the updated project"""
+    object_id = project_object_id(project_id)
+
+    # Each plan is conditioned on its own source statuses, so at most one can match
+    for sources, fields in plan_update(user, update_data):
+        query = {"_id": object_id}
+        if sources is not None:
+            query["status"] = {"$in": sources}
+
+        project = await db.projects.find_one_and_update(
+            query, {"$set": fields}, return_document=ReturnDocument.AFTER
+        )
+        if project is not None:
+            return serialize_project(project)
+    raise await explain_miss(db, object_id, update_data.get("status"))
+
+async def bulk_transition(db, project_ids: list, update_data: dict, user: dict) -> list:
+    """
+    Move many projects to update_data["status"], one conditional find_one_and_update
+    per project sent concurrently after a single pre-read.
+    Returns one {"project_id", "outcome", "status"} per distinct id, in request order;
+    outcome is updated, invalid, not_found or conflict. Raises TransitionError:
+    invalid for an unknown target status, forbidden when the role may not make
+    this transition at all
+    """
+    target = update_data.get("status")
+    if not target:
+        raise TransitionError("invalid", "A target status is required")
+    # source status -> (the plan's source statuses, $set fields)
+    plan_for = {
+        source: (sources, fields)
+        for sources, fields in plan_update(user, update_data) for source in sources
+    }
+
+    results, object_ids = {}, {}
+    for project_id in dict.fromkeys(project_ids):
+        try:
+            object_ids[project_id] = project_object_id(project_id)
+        except TransitionError as e:
+            results[project_id] = {"project_id": project_id, "outcome": e.reason, "detail": e.detail}
+
+    # Pre-read: projects that are missing or in the wrong status are reported without a write
+    current = {
+        project["_id"]: project.get("status")
+        async for project in db.projects.find({"_id": {"$in": list(object_ids.values())}}, {"status": 1})
+    }
+    candidates = []
+    for project_id, object_id in object_ids.items():
+        if object_id not in current:
+            results[project_id] = {"project_id": project_id, "outcome": "not_found"}
+        elif current[object_id] not in plan_for:
+            results[project_id] = {"project_id": project_id, "outcome": "conflict", "status": current[object_id]}
+        else:
+            candidates.append(project_id)
+
+    # Each write is still conditioned on the status, so a concurrent officer can win any item;
+    # the write's own result says whether this call moved the project
+    async def move(project_id):
+        sources, fields = plan_for[current[object_ids[project_id]]]
+        return await db.projects.find_one_and_update(
+            {"_id": object_ids[project_id], "status": {"$in": sources}}, {"$set": fields},
+            projection={"status": 1}, return_document=ReturnDocument.AFTER
+        )
+
+    moved = await asyncio.gather(*(move(project_id) for project_id in candidates))
+    missed = [project_id for project_id, project in zip(candidates, moved) if project is None]
+    after = {}
+    if missed:
+        after = {
+            project["_id"]: project.get("status")
+            async for project in db.projects.find({"_id": {"$in": [object_ids[p] for p in missed]}}, {"status": 1})
+        }
+    for project_id, project in zip(candidates, moved):
+        if project is not None:
+            results[project_id] = {"project_id": project_id, "outcome": "updated", "status": target}
+        elif object_ids[project_id] not in after:
+            results[project_id] = {"project_id": project_id, "outcome": "not_found"}
+        else:
+            results[project_id] = {"project_id": project_id, "outcome": "conflict", "status": after[object_ids[project_id]]}
+
+    return [results[project_id] for project_id in dict.fromkeys(project_ids)]
@@ -0,0 +1,164 @@
+"""
+Batched ingest for offline report sync (/api/sync/reports)
+Existing client_ids are found with one $in query and the rest are written with
+one unordered insert_many; duplicate-key errors from the unique client_id index
+(including repeats inside the same batch) are mapped back to per-item statuses:
+success, duplicate, rejected (permanent: resending the same report fails the
+same way) or error (transient: retry later)
+
+Chunked protocol (/api/sync/reports/chunk): every device numbers its queued
+reports with an increasing `seq` and sends a `store_id` naming its local
+store. The server keeps the highest acknowledged seq per (user, device) in
+`sync_devices`. Items at or below the watermark were settled by an earlier
+chunk and are answered as duplicates without a lookup; the rest are
+deduplicated by client_id, and the watermark advances over the contiguous run
+of settled (success, duplicate or rejected) items, so a permanently invalid
+report cannot pin it. A new store_id (the client's local store was recreated)
+resets the watermark to 0
+"""
+
+import os
+from datetime import datetime
+from bson.errors import InvalidDocument
+from pymongo.errors import BulkWriteError, WriteError
+
+DUPLICATE_KEY = 11000
+# Write error codes that will not go away on retry
+PERMANENT_ERROR_CODES = {2, 121}  # BadValue, DocumentValidationFailure
+
+# Largest chunk a device may send in one request
+SYNC_MAX_CHUNK_SIZE = int(os.getenv("SYNC_MAX_CHUNK_SIZE", "100"))
+
+def _success(doc: dict) -> dict:
+    return {"client_id": doc.get("client_id"), "id": str(doc["_id"]), "status": "success"}
+
+def _duplicate(doc: dict) -> dict:
+    return {"client_id": doc["client_id"], "status": "duplicate"}
+
+def _error(doc: dict, message: str, permanent: bool = False) -> dict:
+    return {"client_id": doc.get("client_id"), "status": "rejected" if permanent else "error", "error": message}
+
+async def _insert_one_by_one(db, pending: list, processed: list):
+    # Fallback when the batch could not be sent at all (e.g. an unencodable document)
+    for index, doc in pending:
+        try:
+            await db.reports.insert_one(doc)
+            processed[index] = _success(doc)
+        except WriteError as e:
+            if e.code == DUPLICATE_KEY and "client_id" in doc:
+                processed[index] = _duplicate(doc)
+            else:
+                processed[index] = _error(doc, str(e), e.code in PERMANENT_ERROR_CODES)
+        except InvalidDocument as e:
+            processed[index] = _error(doc, str(e), permanent=True)
+        except Exception as e:
+            processed[index] = _error(doc, str(e))
+
+async def insert_reports(db, reports: list, user_id: str) -> list:
+    """Insert a batch of offline reports; returns one status per report, in input order"""
+    now = datetime.utcnow()
+    # Copies, so the caller's dicts do not pick up server fields or the inserted _id
+    reports = [{**report_data, "user_id": user_id, "synced": True, "sync_timestamp": now}
+               for report_data in reports]
+
+    # One lookup for every client_id already on the server
+    client_ids = [report_data["client_id"] for report_data in reports if "client_id" in report_data]
+    existing = set()
+    if client_ids:
+        cursor = db.reports.find({"client_id": {"$in": client_ids}}, {"client_id": 1, "_id": 0})
+        existing = {doc["client_id"] async for doc in cursor}
+
+    processed = [None] * len(reports)
+    pending = []
+    for index, report_data in enumerate(reports):
+        if "client_id" in report_data and report_data["client_id"] in existing:
+            processed[index] = _duplicate(report_data)
+        else:
+            pending.append((index, report_data))
+
+    if pending:
+        docs = [doc for _, doc in pending]
+        failed = {}
+        try:
+            await db.reports.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+        except Exception:
+            await _insert_one_by_one(db, pending, processed)
+            return processed
+
+        for position, (index, doc) in enumerate(pending):
+            error = failed.get(position)
+            if error is None:
+                processed[index] = _success(doc)
+            elif error.get("code") == DUPLICATE_KEY and "client_id" in doc:
+                processed[index] = _duplicate(doc)
+            else:
+                processed[index] = _error(doc, error.get("errmsg", "write failed"),
+                                          error.get("code") in PERMANENT_ERROR_CODES)
+
+    return processed
+
+def _device_key(user_id: str, device_id: str) -> str:
+    return f"{user_id}:{device_id}"
+
+async def get_watermark(db, user_id: str, device_id: str, store_id: str = None) -> int:
+    """Highest report seq the server has settled for this device (0 when none)
+    A store_id different from the recorded one resets the watermark"""
+    key = _device_key(user_id, device_id)
+    device = await db.sync_devices.find_one({"_id": key}, {"acked_seq": 1, "store_id": 1})
+    if store_id is None:
+        return device["acked_seq"] if device else 0
+    if device is None or device.get("store_id") != store_id:
+        # New local store: its seqs start again from 1
+        await db.sync_devices.update_one(
+            {"_id": key},
+            {"$set": {"acked_seq": 0, "store_id": store_id, "user_id": user_id, "device_id": device_id,
+                      "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        return 0
+    return device["acked_seq"]
+
+async def sync_chunk(db, user_id: str, device_id: str, reports: list, store_id: str = None) -> dict:
+    """Commit one chunk of sequenced reports and advance the device watermark"""
+    acked_seq = await get_watermark(db, user_id, device_id, store_id)
+
+    processed = [None] * len(reports)
+    fresh = []
+    settled = {}
+    for index, report_data in enumerate(reports):
+        report_data = dict(report_data)
+        seq = report_data.pop("seq", None)
+        if not isinstance(seq, int) or isinstance(seq, bool):
+            processed[index] = _error(report_data, "Missing or non-integer seq", permanent=True)
+        elif seq <= acked_seq:
+            # Settled by an earlier chunk whose response the client did not see
+            processed[index] = {"client_id": report_data.get("client_id"), "status": "duplicate", "seq": seq}
+        elif not report_data.get("client_id"):
+            processed[index] = {**_error(report_data, "client_id is required", permanent=True), "seq": seq}
+            settled[seq] = settled.get(seq, True)
+        else:
+            report_data["device_id"] = device_id
+            report_data["device_seq"] = seq
+            fresh.append((index, seq, report_data))
+
+    statuses = await insert_reports(db, [doc for _, _, doc in fresh], user_id)
+    for (index, seq, _), result in zip(fresh, statuses):
+        processed[index] = {**result, "seq": seq}
+        settled[seq] = settled.get(seq, True) and result["status"] != "error"
+
+    # Advance over the contiguous run of settled items; a transient error stops it
+    new_seq = acked_seq
+    for seq in sorted(settled):
+        if not settled[seq]:
+            break
+        new_seq = seq
+
+    if new_seq > acked_seq:
+        await db.sync_devices.update_one(
+            {"_id": _device_key(user_id, device_id)},
+            {"$max": {"acked_seq": new_seq}, "$set": {"user_id": user_id, "device_id": device_id, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+    return {"device_id": device_id, "acked_seq": new_seq, "processed": processed}
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Materialized district/state rollups for dashboard reads
+- district_rollups: one document per (source collection, district) holding the
+  census totals and area names produced by census_stats
+- state_rollups: one document per source collection folded from its district rollups
+Writers refresh only the districts they touched; dashboards read O(districts) documents.
+The dashboards read the "sikkim" collection's rollups, refreshed by upload_json.py and
+upload_json_clean.py; rebuild them with --rebuild-rollups after any other write to it.
+Village-upload rollups (source "villages") that could not be refreshed after an
+upload are flagged stale and recomputed by the next load_village_rollups().
+
+Usage:
+  python rollups.py --rebuild-rollups            # full recomputation
+  python rollups.py --check                      # report stale/missing rollups only
+  python rollups.py --rebuild-rollups --db ruraliq --collection sikkim_villages_raw
+"""
+
+import sys
+import argparse
+from datetime import datetime
+from pymongo import ReplaceOne, DeleteMany, UpdateOne
+
+import census_stats
+
+DISTRICT_ROLLUPS = "district_rollups"
+STATE_ROLLUPS = "state_rollups"
+
+# Village-level uploads (ruraliq.villages) roll up per (state, district)
+VILLAGE_ROLLUP_PIPELINE = [
+    {"$project": {"state": 1, "district": 1, "population": 1, "sc_ratio": 1}},
+    {
+        "$group": {
+            "_id": {"state": "$state", "district": "$district"},
+            "record_count": {"$sum": 1},
+            "population": {"$sum": {"$ifNull": ["$population", 0]}},
+            "sc_population": {
+                "$sum": {"$multiply": [{"$ifNull": ["$population", 0]}, {"$ifNull": ["$sc_ratio", 0]}, 0.01]}
+            },
+        }
+    },
+]
+
+def _rollup_id(source: str, *key) -> str:
+    return ":".join([source, *[str(part) for part in key]])
+
+def _census_rollup_ops(collection, districts=None) -> list:
+    """Replace/delete operations bringing the census rollups of `districts` (all when None) up to date"""
+    source = collection.name
+    match = {"district_name": {"$in": list(districts)}} if districts is not None else None
+    totals_by_district = census_stats.aggregate_district_totals(collection, match, with_names=True)
+
+    now = datetime.utcnow()
+    ops = [
+        ReplaceOne(
+            {"_id": _rollup_id(source, district)},
+            {"source": source, "district_name": district, "totals": totals, "updated_at": now},
+            upsert=True
+        )
+        for district, totals in totals_by_district.items()
+    ]
+
+    # Drop rollups for districts that no longer have any rows
+    stale = {"source": source, "district_name": {"$nin": list(totals_by_district)}}
+    if districts is not None:
+        stale["district_name"]["$in"] = list(districts)
+    ops.append(DeleteMany(stale))
+    return ops
+
+def _state_rollup(district_rollups, source: str) -> dict:
+    state = {"record_count": 0, **{key: 0 for key in census_stats.CENSUS_FIELDS}}
+    district_count = 0
+    for rollup in district_rollups:
+        district_count += 1
+        for key in state:
+            state[key] += rollup["totals"].get(key, 0)
+    return {"source": source, "district_count": district_count, "totals": state, "updated_at": datetime.utcnow()}
+
+def refresh_district_rollups(collection, districts=None):
+    """Recompute rollups for the touched districts (all when None), then the state rollup"""
+    db = collection.database
+    db[DISTRICT_ROLLUPS].bulk_write(_census_rollup_ops(collection, districts), ordered=False)
+
+    source = collection.name
+    rollups = db[DISTRICT_ROLLUPS].find({"source": source}, {"totals.names": 0})
+    db[STATE_ROLLUPS].replace_one({"_id": source}, _state_rollup(rollups, source), upsert=True)
+
+def load_district_totals(collection, districts=None) -> dict:
+    """{district_name: totals} served from the rollups, sorted by district; empty when not built yet"""
+    query = {"source": collection.name}
+    if districts is not None:
+        query["district_name"] = {"$in": list(districts)}
+
+    rollups = collection.database[DISTRICT_ROLLUPS].find(query).sort("district_name", 1)
+    return {rollup["district_name"]: rollup["totals"] for rollup in rollups}
+
+def load_state_totals(collection):
+    rollup = collection.database[STATE_ROLLUPS].find_one({"_id": collection.name})
+    return rollup["totals"] if rollup else None
+
+async def refresh_village_rollups(db, keys):
+    """Async (Motor) refresh of the village-upload rollups for the touched (state, district) pairs"""
+    keys = {(state, district) for state, district in keys}
+    if not keys:
+        return
+
+    match = {"$or": [{"state": state, "district": district} for state, district in keys]}
+    pipeline = [{"$match": match}, *VILLAGE_ROLLUP_PIPELINE]
+
+    now = datetime.utcnow()
+    ops = []
+    async for row in db.villages.aggregate(pipeline):
+        key = row.pop("_id")
+        keys.discard((key["state"], key["district"]))
+        ops.append(ReplaceOne(
+            {"_id": _rollup_id("villages", key["state"], key["district"])},
+            {"source": "villages", "state": key["state"], "district_name": key["district"], "totals": row, "updated_at": now},
+            upsert=True
+        ))
+    for state, district in keys:
+        ops.append(DeleteMany({"_id": _rollup_id("villages", state, district)}))
+
+    await db[DISTRICT_ROLLUPS].bulk_write(ops, ordered=False)
+
+async def refresh_village_rollups_after_write(db, keys):
+    """refresh_village_rollups for data that is already committed: a failure is logged and the
+    touched rollups are flagged stale instead of failing the write"""
+    try:
+        await refresh_village_rollups(db, keys)
+    except Exception as e:
+        print(f"⚠️ Village rollup refresh failed, marking {len(keys)} districts stale: {e}")
+        ops = [
+            UpdateOne(
+                {"_id": _rollup_id("villages", state, district)},
+                {"$set": {"source": "villages", "state": state, "district_name": district, "stale": True}},
+                upsert=True
+            )
+            for state, district in keys
+        ]
+        try:
+            if ops:
+                await db[DISTRICT_ROLLUPS].bulk_write(ops, ordered=False)
+        except Exception as e:
+            print(f"❌ Could not mark village rollups stale: {e}")
+
+async def load_village_rollups(db, state: str = None) -> list:
+    """Village-upload rollups sorted by (state, district); stale ones are recomputed first"""
+    query = {"source": "villages"}
+    if state:
+        query["state"] = state
+
+    async def read():
+        cursor = db[DISTRICT_ROLLUPS].find(query).sort([("state", 1), ("district_name", 1)])
+        return await cursor.to_list(length=None)
+
+    rollups = await read()
+    stale = [(rollup["state"], rollup["district_name"]) for rollup in rollups if rollup.get("stale")]
+    if stale:
+        await refresh_village_rollups(db, stale)
+        rollups = await read()
+    return rollups
+
+def _comparable(totals: dict) -> dict:
+    # $push order is not deterministic, so area names are compared as sorted lists
+    if "names" not in totals:
+        return totals
+    return {**totals, "names": sorted(totals["names"], key=lambda name: (name is None, str(name)))}
+
+def check_rollups(collection) -> list:
+    """Compare stored rollups with a fresh aggregation and describe every mismatch"""
+    expected = census_stats.aggregate_district_totals(collection, with_names=True)
+    stored = load_district_totals(collection)
+
+    problems = []
+    for district in sorted(set(expected) | set(stored)):
+        if district not in stored:
+            problems.append(f"{district}: missing rollup")
+        elif district not in expected:
+            problems.append(f"{district}: rollup for a district with no rows")
+        else:
+            have, want = _comparable(stored[district]), _comparable(expected[district])
+            if have != want:
+                fields = [key for key in want if have.get(key) != want[key]]
+                problems.append(f"{district}: stale fields {', '.join(fields)}")
+
+    state = load_state_totals(collection)
+    expected_state = _state_rollup(({"totals": totals} for totals in expected.values()), collection.name)["totals"]
+    if expected and state is None:
+        problems.append("state rollup missing")
+    elif state is not None and state != expected_state:
+        problems.append("state rollup stale")
+    return problems
+
+def main():
+    import mongo_pool
+
+    parser = argparse.ArgumentParser(description="Rebuild or verify district/state rollups")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="Recompute every district and state rollup")
+    parser.add_argument("--check", action="store_true", help="Report rollups that differ from the raw census rows")
+    parser.add_argument("--db", default=None, help="Database holding the census collection (default: MONGO_DB_NAME)")
+    parser.add_argument("--collection", default="sikkim", help="Census collection name")
+    args = parser.parse_args()
+
+    collection = mongo_pool.get_collection(args.collection, args.db)
+
+    if args.rebuild_rollups:
+        print(f"🔄 Rebuilding rollups for {collection.database.name}.{collection.name} ...")
+        refresh_district_rollups(collection)
+        print(f"✅ Rebuilt {len(load_district_totals(collection))} district rollups")
+
+    if args.check or not args.rebuild_rollups:
+        problems = check_rollups(collection)
+        if problems:
+            print(f"❌ {len(problems)} rollup inconsistencies:")
+            for problem in problems:
+                print(f"   {problem}")
+            sys.exit(1)
+        print("✅ Rollups match the raw census rows")
+
+if __name__ == "__main__":
+    main()
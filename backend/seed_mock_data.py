@@ -3,6 +3,7 @@ import json
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from auth import get_password_hash
+from gap_engine import recompute_gaps
 import os
 from dotenv import load_dotenv
 
@@ -136,6 +137,10 @@ async def seed_database():
     await db.reports.insert_many(sample_reports)
     print("✅ Created sample reports")
     
+    # Score gaps for every seeded village
+    stats = await recompute_gaps(db, force=True)
+    print(f"✅ Computed gaps for {stats['recomputed']} villages")
+    
     client.close()
     print("🎉 Database seeding completed!")
 
@@ -9,6 +9,8 @@ from dotenv import load_dotenv
 from pymongo import MongoClient
 from datetime import datetime
 import json
+from collections import defaultdict
+from census_stats import CensusAccumulator, VILLAGE_PROJECTION, rate
 
 def get_collection():
     """Connect to MongoDB Atlas and return collection"""
@@ -22,47 +24,37 @@ def get_district_summary():
     """Get comprehensive district-wise summary"""
     collection = get_collection()
     
-    # Get all districts
-    districts = collection.distinct("district_name")
-    districts = sorted([d for d in districts if d])
+    # Single projected scan over all districts instead of two queries per district
+    docs_by_district = defaultdict(list)
+    projection = {**VILLAGE_PROJECTION, "district_name": 1}
+    for doc in collection.find({"district_name": {"$nin": [None, ""]}}, projection):
+        docs_by_district[doc["district_name"]].append(doc)
+    
+    districts = sorted(docs_by_district)
     
     district_data = {}
     total_records = 0
     total_population = 0
     
     for district in districts:
-        query = {"district_name": district}
-        
-        # Basic counts
-        record_count = collection.count_documents(query)
-        total_records += record_count
-        
-        # Get documents for this district
-        docs = list(collection.find(query))
-        
-        # Calculate statistics
-        total_pop = sum(int(doc.get('TOT_P', 0)) for doc in docs if doc.get('TOT_P'))
-        male_pop = sum(int(doc.get('TOT_M', 0)) for doc in docs if doc.get('TOT_M'))
-        female_pop = sum(int(doc.get('TOT_F', 0)) for doc in docs if doc.get('TOT_F'))
-        households = sum(int(doc.get('No_HH_Head', 0)) for doc in docs if doc.get('No_HH_Head'))
-        literate = sum(int(doc.get('P_LIT', 0)) for doc in docs if doc.get('P_LIT'))
-        workers = sum(int(doc.get('TOT_WORK_P', 0)) for doc in docs if doc.get('TOT_WORK_P'))
-        
-        total_population += total_pop
+        docs = docs_by_district[district]
+        totals = CensusAccumulator().update(docs).result()
+        total_records += totals['record_count']
+        total_population += totals['population']
         
         # Village/area names
         areas = [doc.get('Name', 'Unknown') for doc in docs if doc.get('Name')]
         
         district_data[district] = {
-            'record_count': record_count,
-            'total_population': total_pop,
-            'male_population': male_pop,
-            'female_population': female_pop,
-            'households': households,
-            'literate_population': literate,
-            'working_population': workers,
-            'literacy_rate': round((literate / total_pop * 100) if total_pop > 0 else 0, 2),
-            'work_participation': round((workers / total_pop * 100) if total_pop > 0 else 0, 2),
+            'record_count': totals['record_count'],
+            'total_population': totals['population'],
+            'male_population': totals['male'],
+            'female_population': totals['female'],
+            'households': totals['households'],
+            'literate_population': totals['literate'],
+            'working_population': totals['workers'],
+            'literacy_rate': rate(totals['literate'], totals['population']),
+            'work_participation': rate(totals['workers'], totals['population']),
             'areas': areas[:10],  # First 10 areas
             'total_areas': len(areas)
         }
@@ -157,9 +149,10 @@ def display_district_details(district_name):
     print(f"📅 Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Aggregate statistics
-    total_pop = sum(int(doc.get('TOT_P', 0)) for doc in documents)
-    male_pop = sum(int(doc.get('TOT_M', 0)) for doc in documents)
-    female_pop = sum(int(doc.get('TOT_F', 0)) for doc in documents)
+    totals = CensusAccumulator().update(documents).result()
+    total_pop = totals['population']
+    male_pop = totals['male']
+    female_pop = totals['female']
     
     print(f"\n👥 POPULATION STATISTICS")
     print("-" * 40)
@@ -8,7 +8,10 @@ from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
+import mongo_pool
+import metrics
+from census_stats import aggregate_district_totals, literacy_rate, work_participation_rate, gender_ratio
+from rollups import load_district_totals, load_state_totals
 from datetime import datetime
 
 # Load environment
@@ -18,23 +21,24 @@ load_dotenv()
 app = FastAPI(
     title="Sikkim State Administration API", 
     description="District-wise data for state officers",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=mongo_pool.lifespan
 )
+app.include_router(metrics.router)
 
 def get_collection():
     """Connect to MongoDB Atlas and return collection"""
-    uri = os.getenv("MONGO_URI")
-    client = MongoClient(uri)
-    db = client["sih2"]
-    return db["sikkim"]
+    return mongo_pool.get_collection("sikkim")
 
 def get_district_statistics():
     """Get comprehensive district statistics from MongoDB"""
     collection = get_collection()
     
-    # Get all districts
-    districts = collection.distinct("district_name")
-    districts = sorted([d for d in districts if d])
+    # Served from the materialized rollups; one aggregation round trip if they are not built yet
+    rolled_up = load_district_totals(collection)
+    totals_by_district = rolled_up or aggregate_district_totals(collection, with_names=True)
+    districts = list(totals_by_district)
+    state_rollup = load_state_totals(collection) if rolled_up else None
     
     district_stats = {}
     state_totals = {
@@ -45,54 +49,36 @@ def get_district_statistics():
         'total_records': 0
     }
     
-    for district in districts:
-        query = {"district_name": district}
-        
-        # Get all documents for this district
-        docs = list(collection.find(query))
-        record_count = len(docs)
-        
-        # Calculate aggregated statistics
-        total_pop = sum(int(doc.get('TOT_P', 0)) for doc in docs)
-        male_pop = sum(int(doc.get('TOT_M', 0)) for doc in docs)
-        female_pop = sum(int(doc.get('TOT_F', 0)) for doc in docs)
-        households = sum(int(doc.get('No_HH_Head', 0)) for doc in docs)
-        literate = sum(int(doc.get('P_LIT', 0)) for doc in docs)
-        illiterate = sum(int(doc.get('P_ILL', 0)) for doc in docs)
-        workers = sum(int(doc.get('TOT_WORK_P', 0)) for doc in docs)
-        
-        # Calculate rates
-        literacy_rate = round((literate / (literate + illiterate) * 100) if (literate + illiterate) > 0 else 0, 2)
-        work_participation = round((workers / total_pop * 100) if total_pop > 0 else 0, 2)
-        
-        # Update state totals
-        state_totals['total_population'] += total_pop
-        state_totals['total_households'] += households
-        state_totals['total_literate'] += literate
-        state_totals['total_workers'] += workers
-        state_totals['total_records'] += record_count
-        
+    # State totals come from the state rollup when there is one, else they are summed per district
+    for totals in ([state_rollup] if state_rollup else totals_by_district.values()):
+        state_totals['total_population'] += totals['population']
+        state_totals['total_households'] += totals['households']
+        state_totals['total_literate'] += totals['literate']
+        state_totals['total_workers'] += totals['workers']
+        state_totals['total_records'] += totals['record_count']
+    
+    for district, totals in totals_by_district.items():
         # Get area names
-        areas = [doc.get('Name', f"Area {i+1}") for i, doc in enumerate(docs)]
+        areas = [name if name is not None else f"Area {i+1}" for i, name in enumerate(totals['names'])]
         
         district_stats[district] = {
             'district_name': district,
-            'record_count': record_count,
+            'record_count': totals['record_count'],
             'population': {
-                'total': total_pop,
-                'male': male_pop,
-                'female': female_pop,
-                'gender_ratio': round((female_pop / male_pop * 1000) if male_pop > 0 else 0, 0)
+                'total': totals['population'],
+                'male': totals['male'],
+                'female': totals['female'],
+                'gender_ratio': gender_ratio(totals)
             },
-            'households': households,
+            'households': totals['households'],
             'education': {
-                'literate': literate,
-                'illiterate': illiterate,
-                'literacy_rate': literacy_rate
+                'literate': totals['literate'],
+                'illiterate': totals['illiterate'],
+                'literacy_rate': literacy_rate(totals)
             },
             'employment': {
-                'total_workers': workers,
-                'work_participation_rate': work_participation
+                'total_workers': totals['workers'],
+                'work_participation_rate': work_participation_rate(totals)
             },
             'areas': {
                 'names': areas,
@@ -7,22 +7,49 @@ Unified District & State Management System
 - Real district counts from database
 """
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, status, Response, Query
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from pymongo import MongoClient
+import mongo_pool
+import metrics
+from census_stats import aggregate_district_totals, literacy_rate, work_participation_rate, VILLAGE_PROJECTION
+from rollups import load_district_totals
+from pagination import decode_cursor, next_cursor
+from gap_rules import rule_set_for, refresh_rule_sets_sync
 from datetime import datetime, timedelta
 import uuid
 from typing import List, Optional
 from models import *
-from auth import get_current_user, create_access_token, verify_password, get_password_hash
+from auth import get_current_user, create_access_token, hash_password_async, verify_and_update_password, invalidate_user, principal_claims
 
 # Load environment
 load_dotenv()
 
-app = FastAPI(title="Unified District-State Management System")
+def ensure_project_indexes():
+    """Indexes behind the pending-approval and district project listings (keyset on _id)"""
+    projects_collection = get_mongodb_collection("projects")
+    projects_collection.create_index([("status", 1), ("_id", 1)])
+    projects_collection.create_index([("status", 1), ("created_by_district", 1), ("_id", 1)])
+    projects_collection.create_index([("created_by_district", 1), ("_id", 1)])
+
+@asynccontextmanager
+async def lifespan(app):
+    try:
+        ensure_project_indexes()
+    except Exception as e:
+        # Start anyway; requests degrade until MongoDB is reachable
+        print(f"⚠️ Could not create project indexes at startup: {e}")
+    async with mongo_pool.lifespan(app):
+        yield
+
+app = FastAPI(title="Unified District-State Management System", lifespan=lifespan)
+app.include_router(metrics.router)
 
 # Add CORS
 app.add_middleware(
@@ -33,118 +60,115 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Bounded pool for the blocking pymongo calls made from async endpoints
+DB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DB_THREADPOOL_SIZE", "8")),
+    thread_name_prefix="unified-db"
+)
+
+# Default and largest page size for project listings
+PROJECT_PAGE_SIZE = int(os.getenv("PROJECT_PAGE_SIZE", "100"))
+PROJECT_PAGE_MAX = int(os.getenv("PROJECT_PAGE_MAX", "500"))
+
+# The district data served here is Sikkim's; a "Sikkim" gap rule set overrides "default"
+UNIFIED_STATE = os.getenv("UNIFIED_STATE", "Sikkim")
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking database call on the bounded DB pool without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(DB_EXECUTOR, partial(fn, *args, **kwargs))
+
 def get_mongodb_collection(collection_name: str):
-    """Get MongoDB collection"""
-    uri = os.getenv("MONGO_URI")
-    client = MongoClient(uri)
-    db = client["sih2"]
-    return db[collection_name]
+    """Get MongoDB collection from the shared pooled client"""
+    return mongo_pool.get_collection(collection_name)
+
+def find_project_page(query: dict, limit: int, after: Optional[str] = None) -> list:
+    """One keyset page of projects (ordered by _id) with only the ProjectResponse fields"""
+    if after:
+        try:
+            query = {**query, "_id": {"$gt": decode_cursor(after)["_id"]}}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    projects_collection = get_mongodb_collection("projects")
+    return list(projects_collection.find(query, PROJECT_PROJECTION).sort("_id", 1).limit(limit))
+
+def project_responses(projects: list) -> List[dict]:
+    """ProjectResponse fields of projected project documents, with _id exposed as id"""
+    return [{**{k: v for k, v in project.items() if k != "_id"}, "id": str(project["_id"])} for project in projects]
 
-def get_district_data_from_mongodb(district_name: str):
+def set_next_cursor(response: Response, page: list, limit: int):
+    cursor = next_cursor(page, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+
+def district_data_from_totals(district_name: str, totals: dict) -> dict:
+    """District summary fields derived from census totals (aggregated or rolled up)"""
+    return {
+        'district_name': district_name,
+        'total_villages': totals['record_count'],
+        'total_population': totals['population'],
+        'literacy_rate': literacy_rate(totals),
+        'work_participation_rate': work_participation_rate(totals),
+        'households': totals['households']
+    }
+
+def get_district_totals(districts: Optional[List[str]] = None) -> dict:
+    """{district: totals} from the materialized rollups, aggregating the raw rows if they are not built
+    All districts present in the data are returned when `districts` is None"""
+    collection = get_mongodb_collection("sikkim")
+    match = {"district_name": {"$in": districts}} if districts is not None else None
+    return load_district_totals(collection, districts) or aggregate_district_totals(collection, match)
+
+def get_project_counts() -> dict:
+    """{district: {"total": n, "pending_approval": n}} from one aggregation grouped by district and status"""
+    projects_collection = get_mongodb_collection("projects")
+    # Sorted on the (status, created_by_district, _id) index; the group reads only those fields
+    pipeline = [
+        {"$sort": {"status": 1, "created_by_district": 1}},
+        {"$group": {"_id": {"district": "$created_by_district", "status": "$status"}, "count": {"$sum": 1}}}
+    ]
+    
+    counts = {}
+    for row in projects_collection.aggregate(pipeline):
+        district_counts = counts.setdefault(row["_id"].get("district"), {"total": 0, "pending_approval": 0})
+        district_counts["total"] += row["count"]
+        if row["_id"].get("status") == "pending_approval":
+            district_counts["pending_approval"] += row["count"]
+    return counts
+
+def get_district_data_from_mongodb(district_name: str, include_villages: bool = True):
     """Fetch real district data from MongoDB Sikkim collection"""
     collection = get_mongodb_collection("sikkim")
     
-    # Get all documents for this district
-    docs = list(collection.find({"district_name": district_name}))
+    # District totals are computed server-side in one aggregation
+    totals = aggregate_district_totals(collection, {"district_name": district_name}).get(district_name)
     
-    if not docs:
+    if not totals:
         return None
     
-    # Calculate real statistics
-    total_villages = len(docs)
-    total_population = sum(int(doc.get('TOT_P', 0)) for doc in docs)
-    male_pop = sum(int(doc.get('TOT_M', 0)) for doc in docs)
-    female_pop = sum(int(doc.get('TOT_F', 0)) for doc in docs)
-    households = sum(int(doc.get('No_HH_Head', 0)) for doc in docs)
-    literate = sum(int(doc.get('P_LIT', 0)) for doc in docs)
-    illiterate = sum(int(doc.get('P_ILL', 0)) for doc in docs)
-    workers = sum(int(doc.get('TOT_WORK_P', 0)) for doc in docs)
+    district_data = district_data_from_totals(district_name, totals)
     
-    # Calculate rates
-    literacy_rate = round((literate / (literate + illiterate) * 100) if (literate + illiterate) > 0 else 0, 2)
-    work_participation_rate = round((workers / total_population * 100) if total_population > 0 else 0, 2)
-    
-    # Get village details
-    villages = []
-    for doc in docs:
-        village = {
-            'name': doc.get('Name', 'Unknown'),
-            'population': int(doc.get('TOT_P', 0)),
-            'households': int(doc.get('No_HH_Head', 0)),
-            'literacy_rate': round((int(doc.get('P_LIT', 0)) / max(1, int(doc.get('P_LIT', 0)) + int(doc.get('P_ILL', 0)))) * 100, 2)
-        }
-        villages.append(village)
+    if include_villages:
+        # Get village details (only the fields rendered below)
+        villages = []
+        for doc in collection.find({"district_name": district_name}, VILLAGE_PROJECTION):
+            village = {
+                'name': doc.get('Name', 'Unknown'),
+                'population': int(doc.get('TOT_P', 0)),
+                'households': int(doc.get('No_HH_Head', 0)),
+                'literacy_rate': round((int(doc.get('P_LIT', 0)) / max(1, int(doc.get('P_LIT', 0)) + int(doc.get('P_ILL', 0)))) * 100, 2)
+            }
+            villages.append(village)
+        district_data['villages'] = sorted(villages, key=lambda x: x['population'], reverse=True)
     
-    return {
-        'district_name': district_name,
-        'total_villages': total_villages,
-        'total_population': total_population,
-        'literacy_rate': literacy_rate,
-        'work_participation_rate': work_participation_rate,
-        'households': households,
-        'villages': sorted(villages, key=lambda x: x['population'], reverse=True)
-    }
+    return district_data
 
 def generate_unified_gaps(district_name: str, district_data: dict) -> List[dict]:
-    """Generate unified gaps based on real district data"""
-    gaps = []
-    
-    # Education gaps
-    if district_data['literacy_rate'] < 70:
-        gaps.append({
-            'id': str(uuid.uuid4()),
-            'district': district_name,
-            'gap_type': 'education',
-            'severity': 'high' if district_data['literacy_rate'] < 60 else 'medium',
-            'severity_score': round(100 - district_data['literacy_rate'], 1),
-            'description': f"Low literacy rate ({district_data['literacy_rate']}%) requires educational infrastructure",
-            'affected_population': int(district_data['total_population'] * (1 - district_data['literacy_rate']/100)),
-            'estimated_cost_to_fix': district_data['total_villages'] * 2000000,  # 20 lakhs per village
-            'priority_rank': 1
-        })
-    
-    # Employment gaps  
-    if district_data['work_participation_rate'] < 50:
-        gaps.append({
-            'id': str(uuid.uuid4()),
-            'district': district_name,
-            'gap_type': 'healthcare',
-            'severity': 'high',
-            'severity_score': round(50 - district_data['work_participation_rate'], 1),
-            'description': f"Low employment rate ({district_data['work_participation_rate']}%) needs skill development",
-            'affected_population': int(district_data['total_population'] * 0.3),
-            'estimated_cost_to_fix': district_data['total_villages'] * 1500000,  # 15 lakhs per village
-            'priority_rank': 2
-        })
-    
-    # Infrastructure gaps for large districts
-    if district_data['total_villages'] > 12:
-        gaps.append({
-            'id': str(uuid.uuid4()),
-            'district': district_name,
-            'gap_type': 'roads',
-            'severity': 'medium',
-            'severity_score': min(district_data['total_villages'] * 2, 100),
-            'description': f"Rural connectivity issues in {district_data['total_villages']} villages",
-            'affected_population': int(district_data['total_population'] * 0.4),
-            'estimated_cost_to_fix': district_data['total_villages'] * 3000000,  # 30 lakhs per village
-            'priority_rank': 3
-        })
-    
-    # Water supply gaps
-    gaps.append({
-        'id': str(uuid.uuid4()),
-        'district': district_name,
-        'gap_type': 'water',
-        'severity': 'medium',
-        'severity_score': 45.0,
-        'description': f"Water supply infrastructure needs in {district_name}",
-        'affected_population': int(district_data['total_population'] * 0.25),
-        'estimated_cost_to_fix': district_data['total_villages'] * 1000000,  # 10 lakhs per village
-        'priority_rank': 4
-    })
-    
-    return gaps
+    """Generate unified gaps based on real district data (district rules of the shared gap rule set)"""
+    return rule_set_for(UNIFIED_STATE).district_gaps(district_name, district_data)
+
+async def refresh_gap_rules():
+    """Pick up edited gap rule sets (throttled inside gap_rules)"""
+    await run_db(refresh_rule_sets_sync, mongo_pool.get_database())
 
 # ===================== AUTHENTICATION ENDPOINTS =====================
 
@@ -155,12 +179,12 @@ async def register_user(user: UserCreate):
         users_collection = get_mongodb_collection("users")
         
         # Check if user exists
-        existing_user = users_collection.find_one({"email": user.email})
+        existing_user = await run_db(users_collection.find_one, {"email": user.email})
         if existing_user:
             raise HTTPException(status_code=400, detail="User already exists")
         
         # Hash password and create user
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await hash_password_async(user.password)
         user_doc = {
             "_id": str(uuid.uuid4()),
             "name": user.name,
@@ -171,7 +195,8 @@ async def register_user(user: UserCreate):
             "created_at": datetime.utcnow()
         }
         
-        users_collection.insert_one(user_doc)
+        await run_db(users_collection.insert_one, user_doc)
+        invalidate_user(user_doc["email"])
         
         return UserResponse(
             id=user_doc["_id"],
@@ -190,12 +215,19 @@ async def login_user(user: UserLogin):
         users_collection = get_mongodb_collection("users")
         
         # Find user
-        user_doc = users_collection.find_one({"email": user.email})
-        if not user_doc or not verify_password(user.password, user_doc["password"]):
+        user_doc = await run_db(users_collection.find_one, {"email": user.email})
+        valid, new_hash = (False, None)
+        if user_doc:
+            valid, new_hash = await verify_and_update_password(user.password, user_doc["password"])
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
+        # Rehash transparently when BCRYPT_ROUNDS changed since the password was set
+        if new_hash:
+            await run_db(users_collection.update_one, {"_id": user_doc["_id"]}, {"$set": {"password": new_hash}})
+        
         # Create token
-        access_token = create_access_token(data={"sub": user_doc["email"]})
+        access_token = create_access_token(data=principal_claims(user_doc))
         
         return TokenResponse(
             access_token=access_token,
@@ -217,22 +249,18 @@ async def login_user(user: UserLogin):
 async def get_all_districts():
     """Get all districts with real data from MongoDB"""
     try:
-        districts = ["East Sikkim", "North Sikkim", "South Sikkim", "West Sikkim"]
         district_stats = []
         
-        for district in districts:
-            # Get real data from MongoDB
-            district_data = get_district_data_from_mongodb(district)
-            if not district_data:
-                continue
-                
-            # Get projects count
-            projects_collection = get_mongodb_collection("projects")
-            projects_count = projects_collection.count_documents({"district": district})
-            pending_approvals = projects_collection.count_documents({
-                "district": district, 
-                "status": "pending_approval"
-            })
+        # District totals (districts come from the data) and project counts run concurrently
+        totals_by_district, project_counts, _ = await asyncio.gather(
+            run_db(get_district_totals),
+            run_db(get_project_counts),
+            refresh_gap_rules()
+        )
+        
+        for district, totals in totals_by_district.items():
+            district_data = district_data_from_totals(district, totals)
+            counts = project_counts.get(district, {})
             
             # Generate gaps
             gaps = generate_unified_gaps(district, district_data)
@@ -245,8 +273,8 @@ async def get_all_districts():
                 work_participation_rate=district_data['work_participation_rate'],
                 households=district_data['households'],
                 problems_count=len(gaps),
-                projects_count=projects_count,
-                pending_approvals=pending_approvals
+                projects_count=counts.get("total", 0),
+                pending_approvals=counts.get("pending_approval", 0)
             ))
         
         return district_stats
@@ -257,22 +285,24 @@ async def get_all_districts():
 async def get_district_details(district_name: str):
     """Get detailed district information with unified data"""
     try:
-        # Get real data from MongoDB
-        district_data = get_district_data_from_mongodb(district_name)
+        # Get real data from MongoDB and the first page of the district's projects concurrently
+        district_data, projects, _ = await asyncio.gather(
+            run_db(get_district_data_from_mongodb, district_name),
+            run_db(find_project_page, {"created_by_district": district_name}, PROJECT_PAGE_SIZE),
+            refresh_gap_rules()
+        )
         if not district_data:
             raise HTTPException(status_code=404, detail=f"District {district_name} not found")
         
-        # Get projects
-        projects_collection = get_mongodb_collection("projects")
-        projects = list(projects_collection.find({"district": district_name}))
-        
         # Get gaps (unified)
         gaps = generate_unified_gaps(district_name, district_data)
         
         return {
             "district_data": district_data,
             "gaps": gaps,
-            "projects": projects,
+            "projects": project_responses(projects),
+            # Further pages: /api/projects/district/{district_name}?after=<cursor>
+            "projects_next_cursor": next_cursor(projects, PROJECT_PAGE_SIZE),
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
@@ -282,7 +312,10 @@ async def get_district_details(district_name: str):
 async def get_district_gaps(district_name: str):
     """Get unified gap analysis for district"""
     try:
-        district_data = get_district_data_from_mongodb(district_name)
+        district_data, _ = await asyncio.gather(
+            run_db(get_district_data_from_mongodb, district_name, include_villages=False),
+            refresh_gap_rules()
+        )
         if not district_data:
             raise HTTPException(status_code=404, detail=f"District {district_name} not found")
         
@@ -312,7 +345,7 @@ async def create_project(project: ProjectCreate, current_user: dict = Depends(ge
         projects_collection = get_mongodb_collection("projects")
         
         # Check if project already exists for this village
-        existing_project = projects_collection.find_one({
+        existing_project = await run_db(projects_collection.find_one, {
             "village_id": project.village_id,
             "name": project.name,
             "status": {"$nin": ["completed", "cancelled"]}
@@ -339,23 +372,34 @@ async def create_project(project: ProjectCreate, current_user: dict = Depends(ge
             "created_at": datetime.utcnow()
         }
         
-        projects_collection.insert_one(project_doc)
+        await run_db(projects_collection.insert_one, project_doc)
         
         return ProjectResponse(**project_doc, id=project_doc["_id"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/projects/pending-approval", response_model=List[ProjectResponse])
-async def get_pending_approvals(current_user: dict = Depends(get_current_user)):
-    """State officer gets projects pending approval"""
+async def get_pending_approvals(
+    response: Response,
+    district: Optional[str] = None,
+    limit: int = Query(PROJECT_PAGE_SIZE, ge=1, le=PROJECT_PAGE_MAX),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """State officer gets projects pending approval (keyset pages, X-Next-Cursor header)"""
     try:
         if current_user["role"] != "state":
             raise HTTPException(status_code=403, detail="Only state officers can view pending approvals")
         
-        projects_collection = get_mongodb_collection("projects")
-        projects = list(projects_collection.find({"status": "pending_approval"}))
+        query = {"status": "pending_approval"}
+        if district:
+            query["created_by_district"] = district
+        projects = await run_db(find_project_page, query, limit, after)
+        set_next_cursor(response, projects, limit)
         
-        return [ProjectResponse(**project, id=project["_id"]) for project in projects]
+        return project_responses(projects)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -376,7 +420,8 @@ async def approve_project(project_id: str, approval: ProjectApproval, current_us
             "approved_budget": approval.approved_budget
         }
         
-        result = projects_collection.update_one(
+        result = await run_db(
+            projects_collection.update_one,
             {"_id": project_id},
             {"$set": update_data}
         )
@@ -388,14 +433,22 @@ async def approve_project(project_id: str, approval: ProjectApproval, current_us
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/projects/district/{district_name}")
-async def get_district_projects(district_name: str, current_user: dict = Depends(get_current_user)):
-    """Get all projects for a district"""
+@app.get("/api/projects/district/{district_name}", response_model=List[ProjectResponse])
+async def get_district_projects(
+    district_name: str,
+    response: Response,
+    limit: int = Query(PROJECT_PAGE_SIZE, ge=1, le=PROJECT_PAGE_MAX),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get projects created by a district (keyset pages, X-Next-Cursor header)"""
     try:
-        projects_collection = get_mongodb_collection("projects")
-        projects = list(projects_collection.find({"district": district_name}))
+        projects = await run_db(find_project_page, {"created_by_district": district_name}, limit, after)
+        set_next_cursor(response, projects, limit)
         
-        return [ProjectResponse(**project, id=project["_id"]) for project in projects]
+        return project_responses(projects)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
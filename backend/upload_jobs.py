@@ -0,0 +1,247 @@
+"""
+Background upload jobs for /api/upload_village_data?job=true
+- The upload is hashed (sha256) and stored in GridFS once per content hash.
+  While a job is queued or running, resubmitting the same file by the same
+  user with the same default state/district returns that job instead of
+  importing it twice; any other submission (including one of a file whose
+  job already completed or failed) creates a new job
+- A fixed pool of asyncio workers streams stored files through
+  village_ingest.ingest_upload and records progress on the job after every
+  chunk, then refreshes rollups and gaps for the touched districts
+- Job state is persisted in Mongo: on startup queued jobs, and running jobs
+  whose heartbeat went stale, are picked up again. Upserts are idempotent,
+  so a resumed job simply re-ingests its file from the start
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+from rollups import refresh_village_rollups_after_write
+from gap_engine import recompute_districts
+from village_ingest import ingest_upload
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+# Running jobs without a heartbeat for this long are treated as orphaned
+UPLOAD_JOB_STALE_SECONDS = int(os.getenv("UPLOAD_JOB_STALE_SECONDS", "300"))
+
+GRIDFS_BUCKET = "upload_files"
+HASH_BLOCK_SIZE = 1024 * 1024
+# Stored files are spooled to disk beyond this size while being parsed
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+_queue = None
+_workers = []
+
+async def ensure_job_indexes(db):
+    # Jobs used to be unique per content hash across all users
+    indexes = await db.upload_jobs.index_information()
+    if indexes.get("content_hash_1", {}).get("unique"):
+        await db.upload_jobs.drop_index("content_hash_1")
+    await db.upload_jobs.create_index("content_hash")
+    # At most one queued/running job per active_key; finished jobs drop the field
+    await db.upload_jobs.create_index(
+        "active_key", unique=True, partialFilterExpression={"active_key": {"$exists": True}}
+    )
+    await db.upload_jobs.create_index([("status", 1), ("heartbeat_at", 1)])
+
+def _active_key(content_hash: str, current_user: dict) -> str:
+    """Deduplication key: the same file imported by the same user into the same defaults"""
+    return json.dumps([content_hash, current_user.get("id"), current_user.get("state"), current_user.get("district")])
+
+def _hash_file(fileobj) -> str:
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+def job_status(job: dict) -> dict:
+    """Public view of a job document"""
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "rows_processed": job.get("rows_processed", 0),
+        "created": job.get("created", 0),
+        "updated": job.get("updated", 0),
+        "chunks": job.get("chunks", 0),
+        "rows_per_second": job.get("rows_per_second", 0.0),
+        "errors": job.get("errors", []),
+        "created_at": job["created_at"],
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+    }
+
+async def _store_file(db, bucket, upload, content_hash: str):
+    """(GridFS file id, whether it was uploaded now); earlier jobs' copy of the same content is reused"""
+    previous = await db.upload_jobs.find_one({"content_hash": content_hash}, {"file_id": 1})
+    if previous:
+        return previous["file_id"], False
+    file_id = await bucket.upload_from_stream(
+        upload.filename, upload.file, metadata={"content_hash": content_hash}
+    )
+    return file_id, True
+
+async def submit_upload_job(db, upload, current_user: dict):
+    """Store the upload and queue a job for it; returns (job, duplicate)"""
+    content_hash = await run_in_threadpool(_hash_file, upload.file)
+    active_key = _active_key(content_hash, current_user)
+
+    existing = await db.upload_jobs.find_one({"active_key": active_key})
+    if existing:
+        return existing, True
+
+    bucket = AsyncIOMotorGridFSBucket(db, bucket_name=GRIDFS_BUCKET)
+    file_id, uploaded = await _store_file(db, bucket, upload, content_hash)
+
+    now = datetime.utcnow()
+    job = {
+        "_id": str(uuid.uuid4()),
+        "status": "queued",
+        "filename": upload.filename,
+        "content_hash": content_hash,
+        "active_key": active_key,
+        "file_id": file_id,
+        "created_by": current_user.get("id"),
+        "default_state": current_user.get("state"),
+        "default_district": current_user.get("district"),
+        "errors": [],
+        "created_at": now,
+        "heartbeat_at": now,
+    }
+    try:
+        await db.upload_jobs.insert_one(job)
+    except DuplicateKeyError:
+        # Lost a race with an identical submission; keep theirs while it is still active
+        existing = await db.upload_jobs.find_one({"active_key": active_key})
+        if existing:
+            if uploaded:
+                await bucket.delete(file_id)
+            return existing, True
+        await db.upload_jobs.insert_one(job)
+
+    metrics.increment("upload_jobs_submitted")
+    _enqueue(job["_id"])
+    return job, False
+
+def _enqueue(job_id: str):
+    if _queue is not None:
+        _queue.put_nowait(job_id)
+
+async def _claim(db, job_id: str):
+    """Atomically move a queued job to running so only one worker processes it"""
+    now = datetime.utcnow()
+    return await db.upload_jobs.find_one_and_update(
+        {"_id": job_id, "status": "queued"},
+        {"$set": {"status": "running", "started_at": now, "heartbeat_at": now,
+                  "rows_processed": 0, "created": 0, "updated": 0, "chunks": 0}},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def process_job(db, job_id: str):
+    job = await _claim(db, job_id)
+    if job is None:
+        return
+
+    started = time.perf_counter()
+
+    async def record_progress(summary):
+        rows = summary["total_rows"]
+        await db.upload_jobs.update_one({"_id": job_id}, {"$set": {
+            "rows_processed": rows,
+            "created": summary["created"],
+            "updated": summary["updated"],
+            "chunks": summary["chunks"],
+            "rows_per_second": round(rows / max(time.perf_counter() - started, 1e-6), 1),
+            "heartbeat_at": datetime.utcnow(),
+        }})
+
+    bucket = AsyncIOMotorGridFSBucket(db, bucket_name=GRIDFS_BUCKET)
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+        try:
+            await bucket.download_to_stream(job["file_id"], spool)
+            spool.seek(0)
+            summary = await ingest_upload(
+                db, spool, job["filename"], job.get("default_state"), job.get("default_district"),
+                progress=record_progress
+            )
+            await refresh_village_rollups_after_write(db, summary["districts"])
+            await recompute_districts(db, summary["districts"])
+        except Exception as e:
+            metrics.increment("upload_jobs_failed")
+            await db.upload_jobs.update_one({"_id": job_id}, {
+                "$set": {"status": "failed", "finished_at": datetime.utcnow()},
+                "$unset": {"active_key": ""},
+                "$push": {"errors": str(e) or type(e).__name__},
+            })
+            return
+
+    metrics.increment("upload_jobs_completed")
+    await db.upload_jobs.update_one({"_id": job_id}, {
+        "$set": {"status": "completed", "finished_at": datetime.utcnow()},
+        "$unset": {"active_key": ""},
+    })
+
+async def _worker(get_db):
+    while True:
+        job_id = await _queue.get()
+        try:
+            await process_job(await get_db(), job_id)
+        except Exception as e:
+            print(f"❌ Upload job {job_id} crashed: {e}")
+        finally:
+            _queue.task_done()
+
+async def resume_jobs(db) -> int:
+    """Requeue orphaned running jobs and enqueue every queued job"""
+    stale_before = datetime.utcnow() - timedelta(seconds=UPLOAD_JOB_STALE_SECONDS)
+    await db.upload_jobs.update_many(
+        {"status": "running", "heartbeat_at": {"$lt": stale_before}},
+        {"$set": {"status": "queued"}}
+    )
+
+    resumed = 0
+    async for job in db.upload_jobs.find({"status": "queued"}, {"_id": 1}).sort("created_at", 1):
+        _enqueue(job["_id"])
+        resumed += 1
+    return resumed
+
+async def start_workers(get_db, workers: int = None):
+    global _queue
+    if _workers:
+        return
+
+    _queue = asyncio.Queue()
+    db = await get_db()
+    for _ in range(workers or UPLOAD_WORKERS):
+        _workers.append(asyncio.create_task(_worker(get_db)))
+
+    try:
+        await ensure_job_indexes(db)
+        resumed = await resume_jobs(db)
+    except Exception as e:
+        # Start anyway; queued jobs are picked up on the next startup
+        print(f"⚠️ Could not prepare upload jobs at startup: {e}")
+        return
+    if resumed:
+        print(f"🔁 Resumed {resumed} upload jobs")
+
+async def stop_workers():
+    global _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
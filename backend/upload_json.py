@@ -9,6 +9,7 @@ import sys
 import json
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from rollups import refresh_district_rollups
 
 def upload_to_atlas(json_file):
     # Load Atlas connection
@@ -35,6 +36,10 @@ def upload_to_atlas(json_file):
     
     print(f"📊 Found {len(data)} documents")
     
+    # Districts whose rollups change: everything cleared plus everything uploaded
+    touched_districts = set(collection.distinct("district_name"))
+    touched_districts.update(doc.get("district_name") for doc in data)
+    
     # Clear existing data
     existing = collection.count_documents({})
     if existing > 0:
@@ -46,6 +51,10 @@ def upload_to_atlas(json_file):
     result = collection.insert_many(data)
     print(f"✅ Uploaded {len(result.inserted_ids)} documents!")
     
+    # Refresh dashboard rollups for the touched districts
+    refresh_district_rollups(collection, [d for d in touched_districts if d])
+    print("📊 Refreshed district rollups")
+    
     # Show summary
     districts = collection.distinct("district_name")
     print(f"\n🏛️  Districts found: {len(districts)}")
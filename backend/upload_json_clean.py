@@ -8,6 +8,7 @@ import sys
 import json
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from rollups import refresh_district_rollups
 
 def clean_document(doc):
     """Remove MongoDB-specific fields that cause import issues"""
@@ -54,6 +55,10 @@ def upload_to_atlas(json_file):
     
     print(f"📊 Found {len(cleaned_data)} documents")
     
+    # Districts whose rollups change: everything cleared plus everything uploaded
+    touched_districts = set(collection.distinct("district_name"))
+    touched_districts.update(doc.get("district_name") for doc in cleaned_data)
+    
     # Clear existing data
     existing = collection.count_documents({})
     if existing > 0:
@@ -65,6 +70,10 @@ def upload_to_atlas(json_file):
     result = collection.insert_many(cleaned_data)
     print(f"✅ Uploaded {len(result.inserted_ids)} documents!")
     
+    # Refresh dashboard rollups for the touched districts
+    refresh_district_rollups(collection, [d for d in touched_districts if d])
+    print("📊 Refreshed district rollups")
+    
     # Show summary
     districts = collection.distinct("district_name")
     print(f"\n🏛️  Districts found: {len(districts)}")
@@ -1,6 +1,7 @@
 import cloudinary
 import cloudinary.uploader
 from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
 import os
 from dotenv import load_dotenv
 
@@ -19,8 +20,9 @@ async def upload_image_to_cloudinary(file: UploadFile) -> str:
         # Read file content
         file_content = await file.read()
         
-        # Upload to cloudinary
-        result = cloudinary.uploader.upload(
+        # Upload to cloudinary (blocking SDK call, kept off the event loop)
+        result = await run_in_threadpool(
+            cloudinary.uploader.upload,
             file_content,
             folder="ruraliq_reports",
             resource_type="image"
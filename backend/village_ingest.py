@@ -0,0 +1,175 @@
+"""
+Village data ingest for /api/upload_village_data
+- Uploads are parsed as a stream of fixed-size DataFrame chunks (CSV chunksize,
+  read-only openpyxl rows for xlsx) so memory stays bounded by the chunk size
+- Rows are converted column-wise from each chunk (no iterrows)
+- Villages are upserted with UpdateOne(upsert=True) keyed on the unique
+  (state, district, name) index, in unordered bulk_write chunks
+"""
+
+import os
+from datetime import datetime
+from itertools import islice
+import pandas as pd
+from pymongo import UpdateOne
+from starlette.concurrency import run_in_threadpool
+
+# Rows per bulk_write round trip
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "1000"))
+
+# Rows parsed per streamed chunk
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "5000"))
+
+REQUIRED_COLUMNS = ['name', 'population']
+
+# Upload column -> (converter, amenity?) ; missing columns and blanks default to 0
+NUMERIC_COLUMNS = {
+    "population": (int, False),
+    "sc_ratio": (float, False),
+    "water": (int, True),
+    "electricity": (float, True),
+    "schools": (int, True),
+    "health_centers": (int, True),
+    "toilets": (float, True),
+    "internet": (float, True),
+}
+
+def missing_columns(columns) -> list:
+    return [col for col in REQUIRED_COLUMNS if col not in columns]
+
+def _column(df, name: str, default) -> list:
+    """Column as a list of plain Python values (BSON cannot encode numpy scalars)"""
+    if name not in df.columns:
+        return [default] * len(df)
+    column = df[name].astype(object)
+    return column.where(column.notna(), default).tolist()
+
+def _numeric_column(df, name: str, converter) -> list:
+    if name not in df.columns:
+        return [converter(0)] * len(df)
+    return df[name].fillna(0).astype(converter).tolist()
+
+def frame_to_villages(df, default_state=None, default_district=None, now: datetime = None) -> list:
+    """Convert an upload DataFrame into village documents, one column at a time"""
+    now = now or datetime.utcnow()
+    names = _column(df, "name", None)
+    states = _column(df, "state", default_state)
+    districts = _column(df, "district", default_district)
+    numeric = {name: _numeric_column(df, name, converter) for name, (converter, _) in NUMERIC_COLUMNS.items()}
+    amenity_names = [name for name, (_, is_amenity) in NUMERIC_COLUMNS.items() if is_amenity]
+
+    villages = []
+    for i in range(len(df)):
+        villages.append({
+            "name": names[i],
+            "population": numeric["population"][i],
+            "state": states[i],
+            "district": districts[i],
+            "sc_ratio": numeric["sc_ratio"][i],
+            "amenities": {name: numeric[name][i] for name in amenity_names},
+            "updated_at": now
+        })
+    return villages
+
+def village_upsert_ops(villages: list) -> list:
+    return [
+        UpdateOne(
+            {"state": village["state"], "district": village["district"], "name": village["name"]},
+            {"$set": village, "$setOnInsert": {"created_at": village["updated_at"]}},
+            upsert=True
+        )
+        for village in villages
+    ]
+
+async def bulk_upsert_villages(db, villages: list, batch_size: int = None):
+    """Upsert villages in unordered bulk_write chunks and return (created, updated)"""
+    batch_size = batch_size or UPLOAD_BATCH_SIZE
+    created = updated = 0
+
+    for start in range(0, len(villages), batch_size):
+        result = await db.villages.bulk_write(village_upsert_ops(villages[start:start + batch_size]), ordered=False)
+        created += result.upserted_count
+        updated += result.matched_count
+    return created, updated
+
+def _xlsx_frames(fileobj, chunk_rows: int):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise pd.errors.EmptyDataError("No columns to parse from file")
+        columns = [str(col).strip() if col is not None else f"Unnamed: {i}" for i, col in enumerate(header)]
+
+        yielded = False
+        while True:
+            batch = list(islice(rows, chunk_rows))
+            if not batch and yielded:
+                return
+            yielded = True
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+def iter_upload_frames(fileobj, filename: str, chunk_rows: int = None):
+    """Yield the upload as DataFrames of at most `chunk_rows` rows (the first one may be empty)"""
+    chunk_rows = chunk_rows or UPLOAD_CHUNK_ROWS
+    lower = filename.lower()
+
+    if lower.endswith('.csv'):
+        with pd.read_csv(fileobj, chunksize=chunk_rows) as reader:
+            yielded = False
+            for frame in reader:
+                yielded = True
+                yield frame
+            if not yielded:
+                # Header-only file: still surface the columns for validation
+                yield pd.DataFrame(columns=reader.orig_names or [])
+    elif lower.endswith('.xlsx'):
+        yield from _xlsx_frames(fileobj, chunk_rows)
+    else:
+        # Legacy .xls has no streaming reader; parse once and hand out slices
+        df = pd.read_excel(fileobj)
+        for start in range(0, max(len(df), 1), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+async def ingest_upload(db, fileobj, filename: str, default_state=None, default_district=None,
+                        chunk_rows: int = None, batch_size: int = None, progress=None) -> dict:
+    """
+    Stream an uploaded file into the villages collection chunk by chunk
+    Parsing runs in the threadpool; `progress(summary)` is awaited after every chunk.
+    Raises ValueError when required columns are missing.
+    """
+    frames = iter_upload_frames(fileobj, filename, chunk_rows)
+    summary = {"created": 0, "updated": 0, "total_rows": 0, "chunks": 0}
+    touched_districts = set()
+
+    try:
+        while True:
+            frame = await run_in_threadpool(next, frames, None)
+            if frame is None:
+                break
+
+            if summary["chunks"] == 0:
+                missing = missing_columns(frame.columns)
+                if missing:
+                    raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+            villages = frame_to_villages(frame, default_state, default_district)
+            created, updated = await bulk_upsert_villages(db, villages, batch_size)
+            touched_districts.update((village["state"], village["district"]) for village in villages)
+
+            summary["created"] += created
+            summary["updated"] += updated
+            summary["total_rows"] += len(frame)
+            summary["chunks"] += 1
+            if progress:
+                await progress(summary)
+    finally:
+        # Release the parser (and its handle on the upload) even when aborting early
+        frames.close()
+
+    summary["districts"] = touched_districts
+    return summary
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Precomputed village priority index for /api/recommendations
+- village_priority: one document per village (_id = village id string) with its
+  severity_score, gaps and the village fields recommendations display
+- Indexed on severity_score desc (globally, per state and per district), so
+  top-K is an index-ordered read of K documents
+- The gap engine (and calculate_village_gaps) upsert entries alongside every gaps write
+
+Usage:
+  python village_priority.py --rebuild     # backfill from the existing gaps collection
+"""
+
+import argparse
+import asyncio
+from bson import ObjectId
+from pymongo import UpdateOne
+
+import priority_heap
+
+VILLAGE_PRIORITY = "village_priority"
+# Village fields copied onto the priority entry
+PRIORITY_VILLAGE_FIELDS = ("name", "state", "district", "population")
+REBUILD_BATCH_SIZE = 1000
+
+async def ensure_priority_indexes(db):
+    collection = db[VILLAGE_PRIORITY]
+    await collection.create_index([("severity_score", -1), ("_id", 1)])
+    await collection.create_index([("state", 1), ("severity_score", -1), ("_id", 1)])
+    await collection.create_index([("district", 1), ("severity_score", -1), ("_id", 1)])
+
+def priority_entry(village: dict, gaps: dict) -> dict:
+    """The priority entry for a freshly scored gaps document"""
+    entry = {field: village.get(field) for field in PRIORITY_VILLAGE_FIELDS}
+    entry.update({
+        "village_id": gaps["village_id"],
+        "severity_score": gaps["severity_score"],
+        "gap_count": len(gaps["gaps"]),
+        "gaps": gaps["gaps"],
+        "last_updated": gaps["last_updated"],
+    })
+    return entry
+
+def priority_op(entry: dict) -> UpdateOne:
+    return UpdateOne({"_id": entry["village_id"]}, {"$set": entry}, upsert=True)
+
+async def write_priorities(db, entries: list):
+    """Upsert entries into the index, then fold them into the in-process recommendation heaps"""
+    if entries:
+        await db[VILLAGE_PRIORITY].bulk_write([priority_op(entry) for entry in entries], ordered=False)
+        priority_heap.apply_updates(entries)
+
+async def top_villages(db, limit: int = 10, state: str = None, district: str = None) -> list:
+    """The `limit` highest-severity villages, optionally within a state and/or district"""
+    query = {}
+    if state:
+        query["state"] = state
+    if district:
+        query["district"] = district
+    cursor = db[VILLAGE_PRIORITY].find(query, {"_id": 0}).sort([("severity_score", -1), ("_id", 1)]).limit(limit)
+    return await cursor.to_list(length=limit)
+
+async def rebuild_priorities(db, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Backfill the index from the gaps collection (gaps written before it existed)"""
+    async def flush(batch):
+        ids = [ObjectId(gaps["village_id"]) for gaps in batch if ObjectId.is_valid(gaps["village_id"])]
+        projection = {field: 1 for field in PRIORITY_VILLAGE_FIELDS}
+        villages = {str(village["_id"]): village async for village in db.villages.find({"_id": {"$in": ids}}, projection)}
+        entries = [priority_entry(villages[gaps["village_id"]], gaps) for gaps in batch if gaps["village_id"] in villages]
+        await write_priorities(db, entries)
+        return len(entries)
+
+    written, batch = 0, []
+    async for gaps in db.gaps.find({}, {"village_id": 1, "severity_score": 1, "gaps": 1, "last_updated": 1}):
+        batch.append(gaps)
+        if len(batch) >= batch_size:
+            written += await flush(batch)
+            batch = []
+    if batch:
+        written += await flush(batch)
+    return written
+
+async def _main(args):
+    from database import connect_to_mongo, get_database, close_mongo_connection
+
+    await connect_to_mongo()
+    db = await get_database()
+    await ensure_priority_indexes(db)
+    if args.rebuild:
+        written = await rebuild_priorities(db)
+        print(f"✅ Rebuilt {written} village priority entries")
+    await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the village priority index")
+    parser.add_argument("--rebuild", action="store_true", help="Backfill from the gaps collection")
+    asyncio.run(_main(parser.parse_args()))
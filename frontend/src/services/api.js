@@ -55,6 +55,9 @@ export const projectAPI = {
   getProjects: (params) => api.get('/projects', { params }),
   createProject: (data) => api.post('/projects', data),
   updateProject: (id, data) => api.put(`/projects/${id}`, data),
+  bulkTransition: (projectIds, status, extra = {}) =>
+    api.post('/projects/bulk_transition', { project_ids: projectIds, status, ...extra }),
+  getSummary: (params) => api.get('/projects/summary', { params }),
 }
 
 export const reportAPI = {
@@ -70,6 +73,8 @@ export const reportAPI = {
     })
   },
   syncReports: (reports) => api.post('/sync/reports', reports),
+  getSyncWatermark: (deviceId, storeId) => api.get('/sync/reports/watermark', { params: { device_id: deviceId, store_id: storeId } }),
+  syncReportChunk: (deviceId, storeId, reports) => api.post('/sync/reports/chunk', { device_id: deviceId, store_id: storeId, reports }),
 }
 
 export default api
\ No newline at end of file
@@ -7,6 +7,38 @@ const db = new Dexie('RuralIQOfflineDB')
 db.version(1).stores({
   reports: '++id, village_id, description, gps, image, timestamp, synced'
 })
+// v2 indexes client_id; the auto-increment id doubles as the sync sequence number
+db.version(2).stores({
+  reports: '++id, client_id, village_id, description, gps, image, timestamp, synced'
+})
+// v3 adds a meta table holding this store's id; a recreated store gets a new one
+db.version(3).stores({
+  reports: '++id, client_id, village_id, description, gps, image, timestamp, synced',
+  meta: 'key'
+})
+
+// Fallback chunk size until the server reports its limit
+const DEFAULT_SYNC_CHUNK_SIZE = 50
+
+// Stable per-browser id the server keeps the sync watermark for
+function getDeviceId() {
+  let deviceId = localStorage.getItem('ruraliq_device_id')
+  if (!deviceId) {
+    deviceId = window.crypto?.randomUUID?.() || `device_${Date.now()}_${Math.random().toString(36).slice(2)}`
+    localStorage.setItem('ruraliq_device_id', deviceId)
+  }
+  return deviceId
+}
+
+// Id of this IndexedDB store; the server resets the device watermark when it changes,
+// since a recreated store numbers its reports (the sync seq) from 1 again
+async function getStoreId() {
+  const stored = await db.meta.get('store_id')
+  if (stored) return stored.value
+  const storeId = window.crypto?.randomUUID?.() || `store_${Date.now()}_${Math.random().toString(36).slice(2)}`
+  await db.meta.put({ key: 'store_id', value: storeId })
+  return storeId
+}
 
 const OfflineContext = createContext()
 
@@ -76,35 +108,66 @@ export function OfflineProvider({ children }) {
     if (!isOnline || pendingReports.length === 0) return
 
     try {
-      const reportsToSync = await db.reports.where('synced').equals(false).toArray()
-      
-      if (reportsToSync.length === 0) return
-
-      // Convert reports to API format
-      const formattedReports = reportsToSync.map(report => ({
-        village_id: report.village_id,
-        description: report.description,
-        gps_lat: report.gps.lat,
-        gps_long: report.gps.long,
-        client_id: report.client_id,
-        timestamp: report.timestamp
-      }))
-
-      const response = await reportAPI.syncReports(formattedReports)
-      
-      // Mark synced reports
-      const syncedIds = response.data.processed
-        .filter(p => p.status === 'success')
-        .map(p => p.client_id)
-
-      await db.reports
-        .where('client_id')
-        .anyOf(syncedIds)
+      const deviceId = getDeviceId()
+      const storeId = await getStoreId()
+
+      const { data: watermark } = await reportAPI.getSyncWatermark(deviceId, storeId)
+      const chunkSize = watermark.max_chunk_size || DEFAULT_SYNC_CHUNK_SIZE
+      const since = watermark.since || 0
+
+      // Reports at or below the watermark were settled by a chunk whose response
+      // was lost; they are marked synced and not sent again
+      let synced = await db.reports
+        .where('id').belowOrEqual(since)
+        .filter(report => !report.synced && !report.sync_error)
         .modify({ synced: true })
+      let lastId = since
+
+      // Reports the server rejected permanently are parked with their error
+      while (true) {
+        const chunk = await db.reports
+          .where('id').above(lastId)
+          .filter(report => !report.synced && !report.sync_error)
+          .limit(chunkSize)
+          .toArray()
+        if (chunk.length === 0) break
+
+        // Convert reports to API format; seq is the local auto-increment id
+        const formattedReports = chunk.map(report => ({
+          seq: report.id,
+          village_id: report.village_id,
+          description: report.description,
+          gps_lat: report.gps.lat,
+          gps_long: report.gps.long,
+          client_id: report.client_id,
+          timestamp: report.timestamp
+        }))
+
+        const response = await reportAPI.syncReportChunk(deviceId, storeId, formattedReports)
+
+        let retryLater = false
+        await db.transaction('rw', db.reports, async () => {
+          for (const [index, result] of response.data.processed.entries()) {
+            const id = chunk[index].id
+            if (result.status === 'success' || result.status === 'duplicate') {
+              await db.reports.update(id, { synced: true })
+              synced += 1
+            } else if (result.status === 'rejected') {
+              await db.reports.update(id, { sync_error: result.error })
+            } else {
+              retryLater = true
+            }
+          }
+        })
+
+        // A transient failure is retried on the next sync
+        if (retryLater) break
+        lastId = chunk[chunk.length - 1].id
+      }
 
       await loadPendingReports()
       
-      return { success: true, synced: syncedIds.length }
+      return { success: true, synced }
     } catch (error) {
       console.error('Failed to sync reports:', error)
       return { success: false, error: 'Sync failed' }